@@ -0,0 +1,64 @@
+"""
+compare serialization of a large commit against the old list copy + remove loop.
+
+    python -m benchmarks.bench_commit
+"""
+
+from collections import deque
+
+from wfapi.operation import EditOperation
+
+from .common import make_project, sample_ids, bench
+
+
+def old_build_transaction(project):
+    operations = []
+    for op in project.operations[:]:
+        op.pre_operation()
+        op_json = op.get_operation()
+        op_json["client_timestamp"] = project.get_client_timestamp()
+        op_json["undo_data"] = op.get_undo()
+        operations.append(op_json)
+        project.operations.remove(op)
+
+    return operations
+
+
+def new_build_transaction(project):
+    operations = []
+    while project.operations:
+        operations.extend(project.build_transaction()["operations"])
+
+    return operations
+
+
+def main(width=40, depth=3, count=50000):
+    project = make_project(width, depth)
+    ids = sample_ids(project, count)
+    print(f"{len(project)} nodes, {len(ids)} edit operations")
+
+    def queue(operations):
+        def func():
+            operations.clear()
+            operations.extend(
+                EditOperation(project, project.find_node(projectid), name="x")
+                for projectid in ids)
+
+        return func
+
+    def run(build, operations):
+        def func():
+            queue(operations)()
+            project.operations = operations
+            build(project)
+
+        return func
+
+    base = bench("queue operations", queue([]))
+    old = bench("list copy + remove", run(old_build_transaction, [])) - base
+    new = bench("deque + build_transaction", run(new_build_transaction, deque())) - base
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+compare projectid lookup by raw_index against the old path walking.
+
+    python -m benchmarks.bench_find_node
+"""
+
+from .common import make_project, sample_ids, bench
+
+
+def main(width=60, depth=3, count=2000):
+    project = make_project(width, depth)
+    ids = sample_ids(project, count)
+    print(f"{len(project)} nodes, {len(ids)} random lookups")
+
+    def by_path():
+        for projectid in ids:
+            project.resolve_path(project.find_path(projectid))
+
+    def by_index():
+        for projectid in ids:
+            project.find_raw(projectid)
+
+    old = bench("find_path + resolve_path", by_path)
+    new = bench("raw_index", by_index)
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
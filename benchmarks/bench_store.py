@@ -0,0 +1,35 @@
+"""
+compare memory of dict tree (Project) and ColumnarProject.
+
+    python -m benchmarks.bench_store
+"""
+
+import gc
+import tracemalloc
+
+from wfapi.project import Project
+from wfapi.store import ColumnarProject
+
+from .common import make_ptree, bench
+
+
+def measure(project_class, width, depth):
+    gc.collect()
+    tracemalloc.start()
+    project = project_class(None, make_ptree(width, depth))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return project, current
+
+
+def main(width=50, depth=3):
+    for project_class in (Project, ColumnarProject):
+        project, current = measure(project_class, width, depth)
+        print(f"{project_class.__name__:<20} {len(project)} nodes, {current / 2 ** 20:8.1f} MiB")
+        bench(f"{project_class.__name__}.walk_raw", lambda: sum(1 for _ in project.walk_raw()))
+        del project
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+compare peak memory and time to first node of json.loads and StreamDecoder.
+
+    python -m benchmarks.bench_stream
+"""
+
+import json
+import time
+import tracemalloc
+
+from wfapi.stream import StreamDecoder, TrackBuilder
+
+from .common import make_ptree
+
+CHUNK_SIZE = 64 * 1024
+
+
+def chunks_of(payload):
+    for i in range(0, len(payload), CHUNK_SIZE):
+        yield payload[i:i + CHUNK_SIZE]
+
+
+def measure(name, decode, payload):
+    first = []
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    decode(payload, lambda: first or first.append(time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<16} total {elapsed * 1000:9.1f} ms, "
+          f"first node {(first[0] - start) * 1000:9.1f} ms, "
+          f"peak {peak / 2 ** 20:8.1f} MiB")
+
+
+def by_loads(payload, on_first):
+    # simulate requests: whole body is read before decoding.
+    body = b"".join(chunks_of(payload))
+    data = json.loads(body)
+    on_first()
+    TrackBuilder().finish(data["projectTreeData"]["mainProjectTreeInfo"]["rootProjectChildren"])
+
+
+def by_stream(payload, on_first):
+    builder = TrackBuilder()
+
+    def on_node(raw):
+        on_first()
+        builder(raw)
+
+    data = StreamDecoder(chunks_of(payload), on_node=on_node).decode()
+    builder.finish(data["projectTreeData"]["mainProjectTreeInfo"]["rootProjectChildren"])
+
+
+def main(width=40, depth=3):
+    payload = json.dumps({
+        "projectTreeData": {
+            "mainProjectTreeInfo": make_ptree(width, depth),
+        },
+    }).encode()
+    print(f"{len(payload) / 2 ** 20:.1f} MiB payload")
+
+    measure("json.loads", by_loads, payload)
+    measure("StreamDecoder", by_stream, payload)
+
+
+if __name__ == "__main__":
+    main()
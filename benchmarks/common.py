@@ -0,0 +1,56 @@
+import random
+import timeit
+
+from wfapi.project import Project
+
+__all__ = ["make_children", "make_ptree", "make_project", "sample_ids", "bench"]
+
+
+def make_children(width, depth, prefix="n"):
+    if depth == 0:
+        return []
+
+    children = []
+    for i in range(width):
+        projectid = f"{prefix}.{i}"
+        raw = {
+            "id": projectid,
+            "nm": f"item {projectid}",
+            "lm": 1000 + i,
+        }
+
+        ch = make_children(width, depth - 1, projectid)
+        if ch:
+            raw["ch"] = ch
+
+        children.append(raw)
+
+    return children
+
+
+def make_ptree(width, depth):
+    return {
+        "rootProject": None,
+        "rootProjectChildren": make_children(width, depth),
+        "initialMostRecentOperationTransactionId": "1",
+        "initialPollingIntervalInMs": 10000,
+        "dateJoinedTimestampInSeconds": 1500000000,
+        "itemsCreatedInCurrentMonth": 0,
+        "monthlyItemQuota": 250,
+    }
+
+
+def make_project(width, depth):
+    # workflowy is only required for network operations.
+    return Project(None, make_ptree(width, depth))
+
+
+def sample_ids(project, count, seed=0):
+    ids = sorted(project.track)
+    return random.Random(seed).sample(ids, min(count, len(ids)))
+
+
+def bench(name, func, number=1):
+    best = min(timeit.repeat(func, number=number, repeat=3))
+    print(f"{name:<40} {best * 1000:10.3f} ms")
+    return best
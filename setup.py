@@ -29,6 +29,10 @@ setup(
     require=[
         "requests",
     ],
+    extras_require={
+        "numpy": ["numpy"],
+        "aiohttp": ["aiohttp"],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Operating System :: OS Independent",
@@ -0,0 +1,210 @@
+"""
+offline workflowy server for the tests: push_and_poll applies the operations
+to its own tree and echoes them back like the real server.
+"""
+
+import copy
+import json
+
+from wfapi import Workflowy
+from wfapi.browser import Browser
+
+DATE_JOINED = 1500000000
+
+
+def make_children(width, depth, prefix="n"):
+    """
+    nested raw nodes: "n.0", "n.0.1", ... with names, tags and some completed nodes.
+    """
+    if depth == 0:
+        return []
+
+    children = []
+    for i in range(width):
+        projectid = f"{prefix}.{i}"
+        raw = {"id": projectid, "nm": f"name {projectid} #tag{i % 3} @p{i % 2}", "lm": 100 + i}
+        if i % 4 == 0:
+            raw["cp"] = 50 + i
+
+        if i % 5 == 0:
+            raw["no"] = f"desc of {projectid}"
+
+        ch = make_children(width, depth - 1, projectid)
+        if ch:
+            raw["ch"] = ch
+
+        children.append(raw)
+
+    return children
+
+
+class FakeServer:
+    def __init__(self, children):
+        self.root = {"id": "None", "ch": children}
+        self.tid = 1
+        self.requests = []  # transactions of each push_and_poll
+        self.fail_next = None  # error of the next transaction
+        self.down = False  # push_and_poll raises ConnectionError
+        self.shared = {}  # share_id -> FakeServer
+
+    def index(self):
+        index = {}
+        stack = [self.root]
+        while stack:
+            raw = stack.pop()
+            index[raw["id"]] = raw
+            stack.extend(raw.get("ch", ()))
+
+        return index
+
+    def parent_of(self, projectid):
+        for raw in self.index().values():
+            for child in raw.get("ch", ()):
+                if child["id"] == projectid:
+                    return raw
+
+        return None
+
+    def apply(self, op):
+        kind, data = op["type"], op["data"]
+        index = self.index()
+        if kind == "create":
+            parent = index[data["parentid"]]
+            parent.setdefault("ch", []).insert(data["priority"], {"id": data["projectid"], "nm": ""})
+        elif kind == "edit":
+            raw = index[data["projectid"]]
+            if data.get("name") is not None:
+                raw["nm"] = data["name"]
+
+            if data.get("description") is not None:
+                raw["no"] = data["description"]
+        elif kind == "complete":
+            index[data["projectid"]]["cp"] = 1
+        elif kind == "uncomplete":
+            index[data["projectid"]].pop("cp", None)
+        elif kind == "delete":
+            parent = self.parent_of(data["projectid"])
+            if parent is None:
+                raise KeyError(data["projectid"])
+
+            parent["ch"][:] = [child for child in parent["ch"] if child["id"] != data["projectid"]]
+        elif kind == "move":
+            parent = self.parent_of(data["projectid"])
+            raw = index[data["projectid"]]
+            parent["ch"][:] = [child for child in parent["ch"] if child["id"] != data["projectid"]]
+            index[data["parentid"]].setdefault("ch", []).insert(data["priority"], raw)
+        else:
+            raise ValueError(kind)
+
+    def ptree_info(self):
+        return {
+            "rootProject": None,
+            "rootProjectChildren": copy.deepcopy(self.root["ch"]),
+            "initialMostRecentOperationTransactionId": str(self.tid),
+            "initialPollingIntervalInMs": 10000,
+            "dateJoinedTimestampInSeconds": DATE_JOINED,
+            "itemsCreatedInCurrentMonth": 0,
+            "monthlyItemQuota": 10 ** 9,
+        }
+
+    def init_data(self):
+        return {
+            "globals": {"USER_ID": "1"},
+            "settings": {},
+            "projectTreeData": {
+                "clientId": "client",
+                "mainProjectTreeInfo": self.ptree_info(),
+                "auxiliaryProjectTreeInfos": [
+                    dict(sub.ptree_info(), shareId=share_id, shareType="url")
+                    for share_id, sub in self.shared.items()
+                ],
+            },
+        }
+
+    def push_and_poll(self, info):
+        if self.down:
+            raise ConnectionError("server is down")
+
+        transactions = json.loads(info["push_poll_data"])
+        self.requests.append(transactions)
+
+        results = []
+        for transaction in transactions:
+            if self.fail_next:
+                error, self.fail_next = self.fail_next, None
+                results.append({"error": error})
+                continue
+
+            target = self.shared[transaction["share_id"]] if "share_id" in transaction else self
+            root = copy.deepcopy(target.root)
+            try:
+                for op in transaction["operations"]:
+                    target.apply(op)
+            except KeyError as e:
+                # rejected transaction isn't applied.
+                target.root = root
+                results.append({"error": f"node not found: {e}"})
+                continue
+
+            self.tid += 1
+            results.append({
+                "server_run_operation_transaction_json": json.dumps({"ops": [
+                    {"type": op["type"], "data": op["data"]}
+                    for op in transaction["operations"]
+                ]}),
+                "new_most_recent_operation_transaction_id": str(self.tid),
+                "new_polling_interval_in_ms": 10000,
+            })
+
+        return {"results": results}
+
+    def names(self, projectid="None"):
+        return [child.get("nm") for child in self.index()[projectid].get("ch", ())]
+
+
+class FakeBrowser(Browser):
+    chunk_size = 1000
+
+    def __init__(self, server: FakeServer):
+        super().__init__()
+        self.server = server
+
+    def open(self, url, _raw=False, _query=None, **kwargs):
+        if url == "":
+            return None, '<script type="text/javascript">var X = 1;</script>'
+        elif url == "get_initialization_data":
+            return None, self.server.init_data()
+        elif url == "push_and_poll":
+            return None, self.server.push_and_poll(kwargs)
+
+        raise KeyError(url)
+
+    def open_stream(self, url, _query=None, **kwargs):
+        data = json.dumps(self.open(url, _query=_query, **kwargs)[1]).encode()
+        size = self.chunk_size
+        return None, (data[i:i + size] for i in range(0, len(data), size))
+
+    def set_cookie(self, name, value):
+        pass
+
+
+def fake_session(width=3, depth=3, children=None, **kwargs):
+    """
+    :return: Workflowy on the FakeServer (tree of make_children or given children), and the server.
+    """
+    server = FakeServer(make_children(width, depth) if children is None else children)
+    return Workflowy(browser=FakeBrowser(server), **kwargs), server
+
+
+def assert_synced(wf: Workflowy, server: FakeServer):
+    # local tree is same as the server tree.
+    project = wf.main
+    project.index_all()
+    index = server.index()
+    assert set(index) == set(project.track)
+    for projectid, raw in index.items():
+        local = project.find_raw(projectid)
+        assert [child["id"] for child in raw.get("ch", ())] == \
+               [child["id"] for child in local.get("ch", ())], projectid
+        if projectid != "None":
+            assert (raw.get("nm") or "") == (local.get("nm") or ""), projectid
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+
+from fakewf import FakeServer, make_children, assert_synced
+from wfapi.aio import AsyncBrowser, AsyncWorkflowy
+from wfapi.error import WFRuntimeError
+
+
+class FakeAsyncBrowser(AsyncBrowser):
+    chunk_size = 1000
+
+    def __init__(self, server: FakeServer):
+        super().__init__()
+        self.server = server
+        self.log = []
+
+    async def open(self, url, _raw=False, _query=None, **kwargs):
+        await asyncio.sleep(0)
+        if url == "":
+            return None, '<script type="text/javascript">var X = 1;</script>'
+        elif url == "get_initialization_data":
+            return None, self.server.init_data()
+        elif url == "push_and_poll":
+            return None, self.server.push_and_poll(kwargs)
+
+        raise KeyError(url)
+
+    async def open_stream(self, url, _query=None, **kwargs):
+        _, data = await self.open(url, _query=_query, **kwargs)
+        data = json.dumps(data).encode()
+
+        async def iter_content():
+            for i in range(0, len(data), self.chunk_size):
+                self.log.append("received")
+                yield data[i:i + self.chunk_size]
+                await asyncio.sleep(0.001)
+
+        return None, iter_content()
+
+    def set_cookie(self, name, value):
+        pass
+
+
+def async_session(width=3, depth=2, **kwargs):
+    server = FakeServer(make_children(width, depth))
+    return AsyncWorkflowy(browser=FakeAsyncBrowser(server), **kwargs), server
+
+
+def test_async_session():
+    async def main():
+        wf, server = async_session()
+        await wf.init()
+        project = wf.main
+
+        async with wf.transaction():
+            node = wf.root.create()
+            node.edit("first")
+
+        assert server.names()[-1] == "first"
+
+        project["n.0"].edit("queued")
+        assert server.names()[0] != "queued"
+        results = await project.commit()
+        assert len(results) == 1
+        assert server.names()[0] == "queued"
+
+        async with wf.pipeline():
+            project["n.1"].edit("a")
+            second = wf.root.create()
+            second.edit("second")
+
+        assert len(server.requests) == 3
+        assert server.names()[-2:] == ["first", "second"]
+
+        server.fail_next = "rejected"
+        project["n.2"].edit("rejected")
+        with pytest.raises(WFRuntimeError):
+            await wf.flush()
+
+        assert project["n.2"].name == server.names()[2]
+        await wf.close()
+        assert_synced(wf, server)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("size", [50, 1000, 100000])
+def test_async_stream(size):
+    async def main():
+        wf, server = async_session(4, 3, stream=True)
+        wf.browser.chunk_size = size
+        decode = wf._decode_initialization_chunks
+
+        def decode_logged(chunks):
+            def iter_logged():
+                for chunk in chunks:
+                    wf.browser.log.append("decoded")
+                    yield chunk
+
+            return decode(iter_logged())
+
+        wf._decode_initialization_chunks = decode_logged
+        await wf.init()
+        assert_synced(wf, server)
+        assert wf.main.indexed
+
+        log = wf.browser.log
+        assert log.count("received") == log.count("decoded")
+        if log.count("received") > 1:
+            # decoded while the next chunks arrive.
+            assert log.index("decoded") < len(log) - log[::-1].index("received") - 1
+
+    asyncio.run(main())
+
+
+def test_async_stream_error():
+    async def main():
+        wf, server = async_session(stream=True)
+        wf.browser.chunk_size = 10
+
+        async def broken(url, _query=None, **kwargs):
+            async def iter_content():
+                yield b'{"projectTreeData": {"mainProjectTreeInfo": {"rootProjectChildren": ['
+                raise ConnectionError("closed")
+
+            return None, iter_content()
+
+        wf.browser.open_stream = broken
+        with pytest.raises(ConnectionError):
+            await wf._decode_initialization_stream({})
+
+        async def invalid(url, _query=None, **kwargs):
+            async def iter_content():
+                yield b'{"projectTreeData": ]'
+                for _ in range(1000):
+                    yield b' '
+                    await asyncio.sleep(0)
+
+            return None, iter_content()
+
+        wf.browser.open_stream = invalid
+        with pytest.raises(json.JSONDecodeError):
+            await wf._decode_initialization_stream({})
+
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+import pytest
+
+from fakewf import fake_session, DATE_JOINED
+from wfapi.traverse import traverse
+
+np = pytest.importorskip("numpy")
+
+
+def test_to_arrays():
+    wf, server = fake_session(3, 3)
+    project = wf.main
+    project["n.1"].create()
+    arrays = project.to_arrays()
+
+    order = list(traverse(project.root.raw))
+    assert arrays.ids == [raw["id"] for _, raw, _ in order]
+    assert arrays.ids[0] == "None" and arrays.parent[0] == -1
+
+    for row, (parentid, raw, depth) in enumerate(order):
+        if row:
+            assert arrays.ids[arrays.parent[row]] == parentid
+
+        assert arrays.depth[row] == depth
+        assert arrays.child_count[row] == len(raw.get("ch", ()))
+        assert arrays.completed[row] == (raw.get("cp") is not None)
+        if raw.get("lm") is None:
+            assert np.isnan(arrays.lm[row])
+        else:
+            assert arrays.lm[row] == raw["lm"]
+
+    assert arrays.date_joined == DATE_JOINED
+    assert arrays.completed.sum() == sum(1 for _, raw, _ in order if raw.get("cp") is not None)
+
+
+def test_timestamp_conversion():
+    wf, server = fake_session(2, 2)
+    arrays = wf.main.to_arrays()
+
+    epoch = arrays.to_epoch(arrays.lm)
+    rows = ~np.isnan(arrays.lm)
+    assert (epoch[rows] == arrays.lm[rows] + DATE_JOINED).all()
+
+    dt = arrays.lm_datetime64()
+    assert dt.dtype == np.dtype("datetime64[us]")
+    assert np.isnat(dt[0])
+    row = arrays.ids.index("n.1")
+    assert dt[row] == np.datetime64(DATE_JOINED + 101, "s")
+    assert np.isnat(arrays.cp_datetime64()[row])
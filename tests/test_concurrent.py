@@ -0,0 +1,130 @@
+import random
+import threading
+
+import pytest
+
+from fakewf import fake_session, assert_synced
+from wfapi.lock import RWLock
+
+
+def test_rwlock():
+    lock = RWLock()
+    with lock.read():
+        with lock.read():
+            pass
+
+        with pytest.raises(RuntimeError):
+            with lock.write():
+                pass
+
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+
+    events = []
+
+    def write():
+        with lock.write():
+            events.append("write")
+
+    with lock.read():
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(0.05)
+        assert not events
+
+    writer.join()
+    assert events == ["write"]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_concurrent_readers_and_writer(lazy):
+    wf, server = fake_session(4, 3, lazy=lazy, concurrent=True)
+    project = wf.main
+    ids = list(server.index())
+    errors = []
+    stop = threading.Event()
+
+    def read(seed):
+        rnd = random.Random(seed)
+        try:
+            while not stop.is_set():
+                projectid = rnd.choice(ids)
+                if projectid not in project:
+                    continue
+
+                node = project.find_node(projectid)
+                if node.raw is None:
+                    continue
+
+                project.find_raw(projectid)
+                list(node.walk(max_depth=2))
+                list(node)
+                project.subtree_size(projectid)
+                if projectid != "None":
+                    node.parent
+                    project.document_key(projectid)
+
+                list(wf.root.search("tag1"))
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read, args=(i,)) for i in range(4)]
+    for thread in readers:
+        thread.start()
+
+    rnd = random.Random(0)
+    try:
+        for i in range(40):
+            node = project[rnd.choice(ids[1:])] if rnd.random() < 0.8 else wf.root
+            if node.projectid not in project:
+                continue
+
+            if rnd.random() < 0.7:
+                node.create().edit(f"new {i} #tag1")
+            elif node.projectid != "None":
+                node.edit(f"edited {i}")
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert not errors
+    assert_synced(wf, server)
+
+
+def test_operations_per_thread():
+    wf, server = fake_session(3, 2, concurrent=True)
+    project = wf.main
+    barrier = threading.Barrier(2)
+
+    def worker(name):
+        with project.transaction():
+            project["n.1"].create().edit(name)
+            barrier.wait()
+            assert [op.operation_name for op in project.operations] == ["create", "edit"]
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert sorted(server.names("n.1")[-2:]) == ["a", "b"]
+    assert_synced(wf, server)
+
+
+def test_enable_concurrent():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with project.transaction():
+        project["n.0"].edit("kept")
+        project.enable_concurrent()
+        assert isinstance(project.lock, RWLock)
+        assert project.transaction_level == 1
+        assert len(project.operations) == 1
+
+    assert server.names()[0] == "kept"
+    assert_synced(wf, server)
@@ -0,0 +1,123 @@
+import pytest
+
+from fakewf import fake_session, assert_synced
+from test_operation import sent_operations
+from test_optimistic import snapshot
+from wfapi.error import WFRuntimeError
+from wfapi.store import ColumnarProject
+
+MODES = [
+    pytest.param(False, None, id="echo"),
+    pytest.param(True, None, id="optimistic"),
+    pytest.param(False, ColumnarProject, id="echo-columnar"),
+    pytest.param(True, ColumnarProject, id="optimistic-columnar"),
+]
+
+
+def session(optimistic, project_class, *args):
+    wf, server = fake_session(*args, project_class=project_class)
+    wf.main.optimistic = optimistic
+    return wf, server
+
+
+@pytest.mark.parametrize("optimistic, project_class", MODES)
+def test_delete_many(optimistic, project_class):
+    wf, server = session(optimistic, project_class, 4, 3)
+    project = wf.main
+    ids = ["n.1.0", "n.1.3", "n.1", "n.0.1", "n.0.3", "n.0.2", "n.0.2.1"]
+    project.delete_many(project[projectid] for projectid in ids)
+
+    # deletes under n.1 and n.0.2 are dropped, and siblings are deleted last first.
+    assert sent_operations(server) == [("delete", "n.1"), ("delete", "n.0.3"),
+                                       ("delete", "n.0.2"), ("delete", "n.0.1")]
+    assert [child.projectid for child in project["n.0"]] == ["n.0.0"]
+    assert all(projectid not in project for projectid in ids)
+    assert "n.1.2.1" not in project
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("optimistic, project_class", MODES)
+def test_delete_many_after_edit(optimistic, project_class):
+    wf, server = session(optimistic, project_class, 3, 2)
+    project = wf.main
+    with project.transaction():
+        node = project["n.1"]
+        node.edit("changed")
+        project["n.1.0"].complete()
+        project.delete_many([node, project["n.2"]])
+
+    assert ("delete", "n.1") in sent_operations(server)
+    assert "n.1" not in project and "n.2" not in project
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("optimistic, project_class", MODES)
+def test_delete_many_pending(optimistic, project_class):
+    wf, server = session(optimistic, project_class, 3, 2)
+    project = wf.main
+    with project.transaction():
+        created = wf.root.create()
+        created.edit("pending")
+        child = project["n.0"].create()
+        ids = [created.projectid, child.projectid]
+        project.delete_many([created, project["n.0"]])
+
+    assert all(projectid not in project for projectid in ids)
+    assert all(projectid != ids[0] for _, projectid in sent_operations(server))
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("optimistic, project_class", MODES)
+def test_delete_many_then_descendant(optimistic, project_class):
+    wf, server = session(optimistic, project_class, 3, 3)
+    project = wf.main
+    with project.transaction():
+        descendant = project["n.1.2.0"]
+        project.delete_many([project["n.1"]])
+        descendant.delete()
+        project["n.0.1"].delete()
+
+    assert sent_operations(server) == [("delete", "n.1"), ("delete", "n.0.1")]
+    assert "n.1" not in project and "n.1.2.0" not in project
+    assert_synced(wf, server)
+
+
+def test_delete_many_rollback():
+    wf, server = session(True, None, 3, 3)
+    project = wf.main
+    before = snapshot(project)
+    nodes = [project["n.0.1"], project["n.0.2"], project["n.2"]]
+    server.fail_next = "rejected"
+    with pytest.raises(WFRuntimeError):
+        project.delete_many(nodes)
+
+    assert snapshot(project) == before
+    assert [node.raw["id"] for node in nodes] == ["n.0.1", "n.0.2", "n.2"]
+    assert project["n.2.1"].parent is project["n.2"]
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("project_class", [None, ColumnarProject])
+def test_echoed_deletes_in_one_pass(project_class, monkeypatch):
+    wf, server = fake_session(6, 2, project_class=project_class)
+    project = wf.main
+    calls = []
+    remove_children = type(project).remove_children
+    monkeypatch.setattr(project, "remove_children",
+                        lambda parent, children: calls.append(parent.projectid) or
+                        remove_children(project, parent, children))
+
+    project.coalesce = False
+    with project.transaction():
+        project["n.1.0"].delete()
+        project.delete_many([project["n.1.1"], project["n.1.4"], project["n.1.2"]])
+        project["n.2.5"].delete()
+        project["n.2"].edit("changed")
+        project["n.3.0"].delete()
+        project["n.3"].delete()
+
+    # the run of deletes before the edit changes n.1 and n.2 once, and n.3.0 goes with n.3.
+    assert sorted(calls) == ["None", "n.1", "n.2"]
+    assert [child.projectid for child in project["n.1"]] == ["n.1.3", "n.1.5"]
+    assert "n.3" not in project and "n.3.0" not in project
+    assert_synced(wf, server)
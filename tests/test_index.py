@@ -0,0 +1,232 @@
+import random
+from collections import Counter
+
+import pytest
+
+from fakewf import fake_session, assert_synced, make_children
+from wfapi.traverse import traverse
+from wfapi.index import FullTextIndex, IntervalIndex, TagIndex, TimestampIndex, get_tags, get_text
+
+WORDS = ["apple", "pineapple", "apples", "pie", "applied", "dapple", "plea", "ample"]
+
+
+def random_text(rnd):
+    return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(0, 4)))
+
+
+def random_children(seed):
+    rnd = random.Random(seed)
+    children = make_children(4, 3)
+    for top in children:
+        for _, raw, _ in traverse(top):
+            raw["nm"] = random_text(rnd)
+            if rnd.random() < 0.3:
+                raw["no"] = random_text(rnd)
+            else:
+                raw.pop("no", None)
+
+    return children
+
+
+def brute_find(project, text):
+    text = text.lower()
+    found = [projectid for projectid, raw in project.raw_index.items()
+             if projectid != "None" and text in get_text(raw)]
+    found.sort(key=project.document_key)
+    return found
+
+
+QUERIES = [
+    "apple", "APPLE", "ppl", "pie", "apple pie", "le pi", "e pie", "apple pie apple",
+    " apple", "apple ", "pineapple", "plea", "ea", "missing", "pie a",
+]
+
+
+def test_full_text_index():
+    wf, server = fake_session(children=random_children(9))
+    project = wf.main
+    rnd = random.Random(9)
+
+    index = project.add_index(FullTextIndex())
+    for text in QUERIES:
+        assert index.find(text) == brute_find(project, text), text
+        ids = index.candidates(text)
+        assert ids >= set(brute_find(project, text))
+
+    assert index.candidates("  ") is None
+    assert index.lookup("Apple") == {projectid for projectid, raw in project.raw_index.items()
+                                     if "apple" in (raw.get("nm") or "").split() or
+                                     "apple" in (raw.get("no") or "").split()}
+    assert index.lookup_prefix("app") == index.lookup("apple") | index.lookup("apples") | index.lookup("applied")
+    assert index.lookup_suffix("apple") == \
+        index.lookup("apple") | index.lookup("pineapple") | index.lookup("dapple")
+
+    # vocabulary is kept sorted by edits, creates and deletes.
+    for _ in range(40):
+        node = project[rnd.choice(list(project.raw_index)[1:])]
+        action = rnd.random()
+        if action < 0.6:
+            node.edit(random_text(rnd) + " " + rnd.choice(["zebra", "zeal", "pear"]))
+        elif action < 0.8:
+            node.create().edit(random_text(rnd))
+        else:
+            node.delete()
+
+        assert index.vocabulary == sorted(index.postings)
+        assert index.reversed_vocabulary == sorted(word[::-1] for word in index.postings)
+        for text in QUERIES + ["zeal", "ze", "ea", "pear apple", "r a"]:
+            assert index.find(text) == brute_find(project, text), text
+
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("pattern", [
+    "apple", "apple pie", "-pie", "apple -pie", "pie OR plea", '"le pi"', "ppl is:complete",
+])
+def test_search_with_index(pattern):
+    wf, server = fake_session(children=random_children(3))
+    expected = [node.projectid for node in wf.root.search(pattern)]
+    wf.main.add_index(FullTextIndex())
+    assert [node.projectid for node in wf.root.search(pattern)] == expected
+
+
+def brute_tags(project, tag, scopeid="None"):
+    found = [projectid for projectid in project.raw_index
+             if projectid != scopeid and project.is_ancestor(scopeid, projectid) and
+             tag in get_tags(get_text(project.raw_index[projectid]))]
+    found.sort(key=project.document_key)
+    return found
+
+
+def test_tag_index():
+    wf, server = fake_session(4, 3)
+    project = wf.main
+    index = project.add_index(TagIndex())
+    tags = ["#tag0", "#tag1", "#tag2", "@p0", "@p1", "#new"]
+
+    for tag in tags:
+        assert index.find(tag) == brute_tags(project, tag)
+        assert index.find(tag, scope="n.1") == brute_tags(project, tag, "n.1")
+        assert index.find(tag, scope=project["n.1"]) == brute_tags(project, tag, "n.1")
+
+    assert index.find("#TAG0") == index.find("#tag0")
+    assert index.counts() == Counter({tag: len(brute_tags(project, tag)) for tag in tags[:-1]})
+
+    project["n.1.0"].edit("#new and @p1", "#tag1")
+    project["n.1.1"].create().edit("#new")
+    project["n.1.2"].delete()
+    project["n.1.3.3"].edit(description="#new")
+
+    for tag in tags:
+        assert index.count(tag) == len(brute_tags(project, tag))
+        assert index.count(tag, scope="n.1") == len(brute_tags(project, tag, "n.1"))
+
+    assert index.counts(scope="n.1.1") == Counter(
+        {tag: len(brute_tags(project, tag, "n.1.1")) for tag in tags if brute_tags(project, tag, "n.1.1")})
+    assert "#missing" not in index.counts()
+    assert_synced(wf, server)
+
+
+def brute_range(project, key, start=None, end=None):
+    entries = sorted((raw[key], projectid) for projectid, raw in project.raw_index.items()
+                     if raw.get(key) is not None)
+    return [projectid for value, projectid in entries
+            if (start is None or value >= start) and (end is None or value < end)]
+
+
+def test_timestamp_index():
+    wf, server = fake_session(4, 3)
+    project = wf.main
+    modified = project.add_index(TimestampIndex('lm'))
+    completed = project.add_index(TimestampIndex('cp'))
+
+    with pytest.raises(ValueError):
+        TimestampIndex('nm')
+
+    for start, end in [(None, None), (101, None), (None, 102), (101, 103), (200, 100)]:
+        assert list(modified.range(start, end)) == brute_range(project, 'lm', start, end)
+        assert list(completed.range(start, end)) == brute_range(project, 'cp', start, end)
+
+    start = project.get_python_timestamp(102)
+    assert list(modified.range(start)) == brute_range(project, 'lm', 102)
+    assert [node.projectid for node in modified.nodes(start)] == brute_range(project, 'lm', 102)
+
+    now = project.get_client_timestamp() - 1
+    project["n.0.0"].edit("changed")
+    project["n.1.1"].complete()
+    project["n.0"].uncomplete()
+    project["n.2"].delete()
+    new = project["n.3"].create()
+    new.edit("new")
+
+    for key, index in [('lm', modified), ('cp', completed)]:
+        assert list(index.range()) == brute_range(project, key)
+
+    assert set(modified.range(now)) == {"n.0.0", "n.1.1", "n.0", new.projectid}
+    assert list(completed.range(now)) == ["n.1.1"]
+    assert "n.0" not in completed.range()
+    assert_synced(wf, server)
+
+
+def test_timestamp_index_search():
+    wf, server = fake_session(4, 3)
+    project = wf.main
+    project["n.2.1"].edit("recent")
+    project["n.2.2.2"].complete()
+
+    for pattern in ["last-changed:1", "is:complete", "tag1 is:complete", "last-changed:1 is:complete"]:
+        expected = [node.projectid for node in wf.root.search(pattern)]
+        project.add_index(TimestampIndex('lm'))
+        project.add_index(TimestampIndex('cp'))
+        assert [node.projectid for node in wf.root.search(pattern)] == expected, pattern
+        for index in list(project.indexes):
+            project.remove_index(index)
+
+    assert [node.projectid for node in wf.root.search("last-changed:1")] == ["n.2.1", "n.2.2.2"]
+
+
+def check_intervals(project, intervals):
+    order = [raw["id"] for _, raw, _ in traverse(project.root.raw)]
+    assert set(intervals.intervals) == set(order)
+    assert sorted(order, key=intervals.document_key) == order
+    assert sorted(order, key=project.document_key) == order
+
+    for projectid in order[1:]:
+        ancestors = set(project.find_path(projectid)[:-1])
+        for ancestorid in order:
+            expected = ancestorid in ancestors
+            assert intervals.is_ancestor(ancestorid, projectid) == expected
+            assert project.is_ancestor(ancestorid, projectid) == expected
+
+    assert intervals.in_subtree(order, "n.1") == [
+        projectid for projectid in order if "n.1" in project.find_path(projectid)[:-1]]
+
+
+@pytest.mark.parametrize("gap", [IntervalIndex.GAP, 1])
+def test_interval_index(gap):
+    wf, server = fake_session(3, 3)
+    project = wf.main
+    intervals = IntervalIndex()
+    intervals.GAP = gap
+    project.add_index(intervals)
+    check_intervals(project, intervals)
+
+    rnd = random.Random(gap)
+    for _ in range(30):
+        node = project[rnd.choice(list(project.track))]
+        action = rnd.random()
+        if action < 0.5 or node.projectid == "None":
+            node.create(priority=rnd.choice([0, -1, 1]))
+        elif action < 0.7:
+            node.delete()
+        else:
+            parent = project[rnd.choice(list(project.track))]
+            if parent != node and not project.is_ancestor(node.projectid, parent.projectid):
+                node.move(parent, rnd.choice([0, -1]))
+
+        check_intervals(project, intervals)
+
+    if gap == 1:
+        assert intervals.relabel_count
+
+    assert_synced(wf, server)
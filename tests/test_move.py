@@ -0,0 +1,121 @@
+import pytest
+
+from fakewf import fake_session, assert_synced
+from test_operation import sent_operations
+from test_optimistic import optimistic_session, snapshot
+from wfapi.error import WFNodeError, WFRuntimeError
+from wfapi.index import IntervalIndex
+from wfapi.store import ColumnarProject
+
+
+@pytest.mark.parametrize("project_class", [None, ColumnarProject])
+def test_move(project_class):
+    wf, server = fake_session(3, 3, project_class=project_class)
+    project = wf.main
+    moved = project["n.1.2"]
+    grandchild = project["n.1.2.0"]
+    size = moved.subtree_size
+    root_size = wf.root.subtree_size
+
+    moved.move(project["n.0"], priority=1)
+    assert moved.parentid == "n.0"
+    assert project.find_priority(moved) == 1
+    assert [child.projectid for child in project["n.0"]] == ["n.0.0", "n.1.2", "n.0.1", "n.0.2"]
+    assert moved not in project["n.1"]
+    assert project.find_path(grandchild.projectid) == ["None", "n.0", "n.1.2", "n.1.2.0"]
+    assert project["n.0"].subtree_size == 13 + size
+    assert project["n.1"].subtree_size == 13 - size
+    assert wf.root.subtree_size == root_size
+
+    # priority -1 in same parent is the last position after removal.
+    project["n.0.0"].move(project["n.0"])
+    assert [child.projectid for child in project["n.0"]] == ["n.1.2", "n.0.1", "n.0.2", "n.0.0"]
+    assert sent_operations(server)[-1] == ("move", "n.0.0")
+    assert server.requests[-1][0]["operations"][0]["data"]["priority"] == 3
+    assert_synced(wf, server)
+
+
+def test_move_into_subtree():
+    wf, server = fake_session(3, 3)
+    project = wf.main
+    with pytest.raises(WFNodeError):
+        project["n.1"].move(project["n.1.2.0"])
+
+    with pytest.raises(WFNodeError):
+        project["n.1"].move(project["n.1"])
+
+    assert not server.requests
+
+
+def test_move_pending_node():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with project.transaction():
+        node = project["n.0"].create()
+        node.edit("pending")
+        node.move(project["n.2"])
+        other = project["n.1"].create()
+        other.move(project["n.1"], priority=0)
+
+    assert sent_operations(server)[:3] == [("create", node.projectid), ("edit", node.projectid),
+                                           ("move", node.projectid)]
+    assert node.parentid == "n.2" and project.find_priority(node) == 3
+    assert project["n.1"].children[0] is other
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_move_pending_node_indexed(indexed):
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    if indexed:
+        project.add_index(IntervalIndex())
+
+    with project.transaction():
+        node = project["n.0"].create()
+        node.move(project["n.1"])
+        child = node.create()
+        with pytest.raises(WFNodeError):
+            node.move(node)
+
+    assert node.parentid == "n.1" and child.parentid == node.projectid
+    assert project.is_ancestor("n.1", child.projectid)
+    assert_synced(wf, server)
+
+
+def test_move_rollback():
+    wf, server = optimistic_session(3, 3)
+    project = wf.main
+    before = snapshot(project)
+    server.fail_next = "rejected"
+    with pytest.raises(WFRuntimeError):
+        with project.transaction():
+            project["n.1.2"].move(project["n.0"], priority=0)
+            project["n.0.1"].move(project["n.0"])
+            project["n.2"].move(project["n.1.2.0"], priority=1)
+            assert project.find_parentid("n.2") == "n.1.2.0"
+
+    assert snapshot(project) == before
+    assert_synced(wf, server)
+
+
+def test_move_interval_index():
+    wf, server = fake_session(3, 3)
+    project = wf.main
+    index = project.add_index(IntervalIndex())
+    project["n.2"].move(project["n.0.1.1"], priority=0)
+    project["n.0.1"].move(wf.root, priority=0)
+
+    all_ids = list(project.track)
+    for ancestorid in all_ids:
+        path_ids = set()
+        for projectid in all_ids:
+            if ancestorid in project.find_path(projectid)[:-1]:
+                path_ids.add(projectid)
+
+        assert {projectid for projectid in all_ids if project.is_ancestor(ancestorid, projectid)} == path_ids
+
+    assert project.is_ancestor("n.0.1", "n.2.1.0")
+    assert not project.is_ancestor("n.0", "n.2")
+    assert index is project.indexes[-1]
+    assert_synced(wf, server)
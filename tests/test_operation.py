@@ -0,0 +1,122 @@
+import pytest
+
+from fakewf import fake_session, assert_synced
+
+
+def test_complete_from_server():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    node = project["n.1"]
+    assert node.raw.get("cp") is None
+
+    node.complete()
+    assert node.raw["cp"] is not None
+    assert node.completed_at is not None
+    assert server.index()["n.1"]["cp"]
+
+    node.uncomplete()
+    assert node.raw.get("cp") is None
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("coalesce", [True, False])
+def test_delete_pending_node(coalesce):
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    project.coalesce = coalesce
+    with project.transaction():
+        node = project["n.1"].create()
+        node.edit("pending")
+        node.delete()
+        project["n.2"].create().edit("kept")
+
+    assert len(server.names("n.1")) == 3
+    assert server.names("n.2")[-1] == "kept"
+    assert_synced(wf, server)
+
+
+def sent_operations(server):
+    return [(op["type"], op["data"].get("projectid"))
+            for request in server.requests
+            for transaction in request
+            for op in transaction["operations"]]
+
+
+def test_coalesce_edits_and_completes():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    node = project["n.1"]
+    with project.transaction():
+        node.edit("first")
+        node.edit(description="memo")
+        node.edit("second")
+        node.complete()
+        node.uncomplete()
+        node.complete()
+        project["n.2"].edit("other")
+
+    assert sent_operations(server) == [("edit", "n.1"), ("complete", "n.1"), ("edit", "n.2")]
+    edit = server.requests[0][0]["operations"][0]["data"]
+    assert edit["name"] == "second" and edit["description"] == "memo"
+    assert node.name == "second" and node.description == "memo"
+    assert node.raw["cp"]
+    assert_synced(wf, server)
+
+
+def test_coalesce_pending_subtree():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with project.transaction():
+        node = project["n.1"].create()
+        node.edit("pending")
+        child = node.create()
+        child.edit("child")
+        child.complete()
+        kept = project["n.1"].create()
+        node.delete()
+
+    assert sent_operations(server) == [("create", kept.projectid)]
+    assert_synced(wf, server)
+
+
+def test_coalesce_deletes_under_deleted():
+    wf, server = fake_session(3, 3)
+    project = wf.main
+    with project.transaction():
+        project["n.1.2.0"].edit("edited")
+        project["n.1"].delete()
+        project["n.1.2"].delete()
+        project["n.1.2.1"].delete()
+        project["n.2.0"].delete()
+
+    assert sent_operations(server) == [("edit", "n.1.2.0"), ("delete", "n.1"), ("delete", "n.2.0")]
+    assert "n.1" not in project and "n.1.2.1" not in project
+    assert_synced(wf, server)
+
+
+def test_coalesce_move_barrier():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with project.transaction():
+        node = project["n.1"].create()
+        project["n.0"].move(project["n.2"])
+        node.delete()
+
+    assert [kind for kind, _ in sent_operations(server)] == ["create", "move", "delete"]
+    assert_synced(wf, server)
+
+
+def test_coalesce_disabled():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    project.coalesce = False
+    with project.transaction():
+        project["n.1"].edit("a")
+        project["n.1"].edit("b")
+        project["n.1"].complete()
+        project["n.1"].uncomplete()
+
+    assert sent_operations(server) == [
+        ("edit", "n.1"), ("edit", "n.1"), ("complete", "n.1"), ("uncomplete", "n.1")]
+    assert project["n.1"].name == "b"
+    assert_synced(wf, server)
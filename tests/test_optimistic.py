@@ -0,0 +1,112 @@
+import pytest
+
+from fakewf import fake_session, assert_synced
+from wfapi.error import WFRuntimeError
+from test_operation import sent_operations
+
+
+def optimistic_session(*args, **kwargs):
+    wf, server = fake_session(*args, **kwargs)
+    wf.main.optimistic = True
+    return wf, server
+
+
+def snapshot(project):
+    project.index_all()
+    return {projectid: (project.find_parentid(projectid), raw.get("nm"), raw.get("no"), raw.get("cp"),
+                        [child["id"] for child in raw.get("ch", ())])
+            for projectid, raw in project.raw_index.items()}
+
+
+def test_optimistic_apply():
+    wf, server = optimistic_session(3, 2)
+    project = wf.main
+    with project.transaction():
+        node = wf.root.create()
+        assert node.projectid in project
+        node.edit("new", "memo")
+        assert node.name == "new"
+        project["n.1"].complete()
+        assert project["n.1"].raw["cp"]
+        project["n.0"].delete()
+        assert "n.0" not in project and "n.0.1" not in project
+        assert not server.requests
+
+    # echo of the applied operations is skipped.
+    assert [child.name for child in wf.root] == server.names()
+    assert node.description == "memo"
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("failure", ["error", "down"])
+def test_optimistic_rollback(failure):
+    wf, server = optimistic_session(3, 3)
+    project = wf.main
+    before = snapshot(project)
+    deleted = project["n.1"]
+    deleted_child = project["n.1.2.0"]
+    if failure == "error":
+        server.fail_next = "rejected"
+    else:
+        server.down = True
+
+    with pytest.raises(WFRuntimeError if failure == "error" else ConnectionError):
+        with project.transaction():
+            node = wf.root.create()
+            node.edit("new")
+            node.create().edit("child")
+            project["n.0"].edit("changed", "memo")
+            project["n.0.0"].complete()
+            project["n.0.2"].uncomplete()
+            project["n.1"].delete()
+            project["n.2.1"].delete()
+
+    server.down = False
+    assert snapshot(project) == before
+    assert not project.operations
+
+    # cached nodes of the deleted subtrees are bound again.
+    assert deleted.raw is project.raw_index["n.1"]
+    assert deleted_child.raw is project.raw_index["n.1.2.0"]
+    assert project["n.1.2.0"] is deleted_child
+    assert_synced(wf, server)
+
+
+def test_optimistic_delete_under_deleted():
+    wf, server = optimistic_session(3, 3)
+    project = wf.main
+    child = project["n.1.2"]
+    grandchild = project["n.1.2.0"]
+    with project.transaction():
+        project["n.1"].delete()
+        child.delete()
+        grandchild.delete()
+        project["n.2.1"].delete()
+
+    assert sent_operations(server) == [("delete", "n.1"), ("delete", "n.2.1")]
+    assert_synced(wf, server)
+
+    project.coalesce = False
+    parent, child = project["n.2"], project["n.2.0"]
+    with project.transaction():
+        parent.delete()
+        child.delete()
+
+    assert sent_operations(server)[-1] == ("delete", "n.2")
+    assert_synced(wf, server)
+
+
+def test_optimistic_delete_rollback_under_deleted():
+    wf, server = optimistic_session(3, 3)
+    project = wf.main
+    before = snapshot(project)
+    child = project["n.1.2"]
+    server.fail_next = "rejected"
+    with pytest.raises(WFRuntimeError):
+        with project.transaction():
+            project["n.1.2.0"].edit("edited")
+            project["n.1"].delete()
+            child.delete()
+
+    assert snapshot(project) == before
+    assert_synced(wf, server)
@@ -0,0 +1,142 @@
+import pytest
+
+from fakewf import fake_session, assert_synced, FakeServer, make_children
+from wfapi.error import WFRuntimeError
+
+
+def test_pipeline_one_request():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with wf.pipeline():
+        project["n.0"].edit("a")
+        project["n.1"].edit("b")
+        with project.transaction():
+            project["n.2"].edit("c")
+            project["n.2"].complete()
+
+        assert not server.requests
+        # queued transactions are applied locally.
+        assert project["n.0"].name == "a"
+
+    assert len(server.requests) == 1
+    assert [len(transaction["operations"]) for transaction in server.requests[0]] == [1, 1, 2]
+    assert server.names()[:3] == ["a", "b", "c"]
+    assert_synced(wf, server)
+
+
+def test_pipeline_order():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with wf.pipeline():
+        first = wf.root.create()
+        first.edit("first")
+        second = wf.root.create()
+        second.edit("second")
+        second.delete()
+        third = wf.root.create()
+        third.edit("third")
+
+    assert len(server.requests) == 1
+    assert server.names()[-2:] == ["first", "third"]
+    assert [child.name for child in wf.root][-2:] == ["first", "third"]
+    assert_synced(wf, server)
+
+
+def test_pipeline_shared_projects():
+    server = FakeServer(make_children(2, 2))
+    server.shared["share"] = FakeServer(make_children(2, 1, "s"))
+    wf, _ = fake_session(children=[])
+    wf.browser.server = server
+    wf.main = None
+    wf.sub = []
+    wf.init()
+    sub = wf.sub[0]
+
+    with wf.pipeline():
+        wf.main["n.1"].edit("main")
+        sub.find_node("s.0").edit("shared")
+
+    assert len(server.requests) == 1
+    assert server.requests[0][1]["share_id"] == "share"
+    assert server.names()[1] == "main"
+    assert server.shared["share"].names()[0] == "shared"
+    assert sub.find_node("s.0").name == "shared"
+
+
+def test_pipeline_error():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with pytest.raises(WFRuntimeError):
+        with wf.pipeline():
+            project["n.0"].edit("a")
+            server.fail_next = "rejected"
+            node = wf.root.create()
+            node.edit("b")
+
+    # the first transaction failed, the others are applied.
+    assert server.names()[0] != "a"
+    assert project["n.0"].name == server.names()[0]
+    assert server.names()[-1] == "b"
+    assert_synced(wf, server)
+
+
+def test_pipeline_request_failed():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    names = [child.name for child in wf.root]
+    server.down = True
+    with pytest.raises(ConnectionError):
+        with wf.pipeline():
+            node = wf.root.create()
+            node.edit("new")
+            child = node.create()
+            child.edit("child")
+            created = [node.projectid, child.projectid]
+            project["n.0"].edit("changed")
+            project["n.1"].delete()
+
+    # everything queued is rolled back.
+    assert [child.name for child in wf.root] == names
+    assert not any(projectid in project for projectid in created)
+    assert project["n.1.0"].parentid == "n.1"
+    server.down = False
+    assert_synced(wf, server)
+
+
+def test_commit_split():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    project.transaction_size = 2
+    with project.transaction():
+        for i in range(5):
+            project[f"n.{i % 3}"].edit(f"edit {i}")
+        wf.root.create().edit("new")
+
+    assert [[len(transaction["operations"]) for transaction in request]
+            for request in server.requests] == [[2, 2, 1]]
+    assert server.names() == ["edit 3", "edit 4", "edit 2", "new"]
+    assert not project.operations
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("optimistic", [False, True])
+def test_commit_split_error(optimistic):
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    project.transaction_size = 2
+    project.optimistic = optimistic
+    server.fail_next = "rejected"
+    with pytest.raises(WFRuntimeError):
+        with project.transaction():
+            for i in range(3):
+                project[f"n.{i}"].edit(f"edit {i}")
+
+    # the first transaction failed, and the rest of the commit is not left for the next commit.
+    assert not project.operations
+    assert server.names()[:2] == ["name n.0 #tag0 @p0", "name n.1 #tag1 @p1"]
+    assert server.names()[2] == "edit 2"
+    assert [child.name for child in wf.root] == server.names()
+
+    project["n.1"].edit("next")
+    assert [op["data"]["projectid"] for op in server.requests[-1][0]["operations"]] == ["n.1"]
+    assert_synced(wf, server)
@@ -0,0 +1,217 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from fakewf import fake_session, assert_synced, DATE_JOINED
+from wfapi.error import WFNodeNotFoundError
+from wfapi.node import CLIENT_TIMESTAMP, EPOCH_TIMESTAMP
+from wfapi.traverse import traverse
+
+
+def test_raw_index():
+    wf, server = fake_session()
+    project = wf.main
+
+    for projectid, raw in server.index().items():
+        assert project.raw_index[projectid]["id"] == projectid
+        assert project.find_raw(projectid) is project.raw_index[projectid]
+
+    node = project.find_node("n.1.2.0")
+    assert node.raw is project.raw_index["n.1.2.0"]
+    assert project.find_path("n.1.2.0") == ["None", "n.1", "n.1.2", "n.1.2.0"]
+
+    with pytest.raises(WFNodeNotFoundError):
+        project.find_raw("missing")
+
+    child = wf.main["n.1"].create()
+    child.edit("new")
+    assert project.raw_index[child.projectid] is child.raw
+
+    projectid = child.projectid
+    child.delete()
+    assert projectid not in project.raw_index
+    assert "n.1" in project.raw_index
+    assert_synced(wf, server)
+
+
+def test_refresh_project():
+    wf, server = fake_session()
+    project = wf.main
+    changed = project["n.0.1"]
+    removed = project["n.2"]
+    kept = project["n.1.1.1"]
+
+    server.index()["n.0.1"]["nm"] = "changed"
+    server.root["ch"][:] = [raw for raw in server.root["ch"] if raw["id"] != "n.2"]
+    server.root["ch"].append({"id": "new", "nm": "x"})
+    wf.init()
+
+    changes = project.last_refresh
+    assert changes.added == {"new"}
+    assert "n.2" in changes.removed and "n.2.0" in changes.removed
+    assert changes.changed == {"n.0.1"}
+
+    assert changed.name == "changed"
+    assert removed.raw is None
+    assert kept.raw is project.raw_index["n.1.1.1"]
+    assert project["n.1.1.1"] is kept
+
+
+def test_node_equality():
+    wf, server = fake_session()
+    project = wf.main
+    a, b = project["n.0"], project["n.1"]
+
+    assert a == project.new_node(project.find_raw("n.0"))
+    assert hash(a) == hash(project.new_node(projectid="n.0"))
+    assert a != b
+    assert a in project.root and a not in b
+    assert project["n.0.1"] in a
+
+
+def test_node_hash_after_delete():
+    wf, server = fake_session()
+    project = wf.main
+    node, child, other = project["n.1"], project["n.1.0"], project["n.2"]
+    nodes = {node, child, other}
+    hashes = [hash(node), hash(child)]
+
+    node.delete()
+    assert node.raw is None and child.raw is None
+    assert [hash(node), hash(child)] == hashes
+    assert node in nodes and child in nodes
+    assert node != project.new_node(projectid="n.1")
+
+    # node dropped by refresh.
+    server.root["ch"][:] = [raw for raw in server.root["ch"] if raw["id"] != "n.2"]
+    wf.init()
+    assert other.raw is None
+    assert other in nodes
+    assert_synced(wf, server)
+
+
+def test_positions():
+    wf, server = fake_session(5, 2)
+    project = wf.main
+    root = wf.root
+    rnd = random.Random(1)
+
+    for _ in range(60):
+        parent = rnd.choice([root] + root.children)
+        if rnd.random() < 0.5 and len(parent):
+            child = rnd.choice(parent.children)
+            ids = [raw["id"] for raw in parent.raw["ch"]]
+            assert project.find_priority(child) == ids.index(child.projectid)
+            child.delete()
+        else:
+            parent.create(priority=rnd.choice([0, -1, 1, 100]))
+
+        for node in [root] + root.children:
+            for priority, child in enumerate(node):
+                assert project.find_priority(child) == priority
+
+    assert_synced(wf, server)
+
+
+def test_lazy_project():
+    wf, server = fake_session(lazy=True)
+    project = wf.main
+    assert not project.indexed
+    assert "n.0.0.0" not in project.raw_index
+
+    for raw in wf.root.walk_raw():
+        if raw["id"] == "None":
+            continue
+
+        node = project.find_node(raw["id"], raw=raw)
+        assert raw in node.parent.raw["ch"]
+
+    wf, server = fake_session(lazy=True)
+    project = wf.main
+    assert project["n.2.1.0"].parent.projectid == "n.2.1"
+    assert project.find_path("n.2.1.0") == ["None", "n.2", "n.2.1", "n.2.1.0"]
+
+    node = wf.main["n.1.1"].create()
+    node.edit("lazy")
+    assert len(project) == len(server.index())
+    assert_synced(wf, server)
+
+
+def test_subtree_size():
+    wf, server = fake_session(3, 3)
+    project = wf.main
+    rnd = random.Random(13)
+
+    def brute_size(projectid):
+        return sum(1 for _ in traverse(project.find_raw(projectid)))
+
+    assert wf.root.subtree_size == len(server.index())
+    assert project["n.1"].subtree_size == 13
+
+    for _ in range(50):
+        node = project[rnd.choice(list(project.track))]
+        action = rnd.random()
+        if action < 0.4 or node.projectid == "None":
+            node.create().create()
+        elif action < 0.7:
+            node.delete()
+        else:
+            parent = project[rnd.choice(list(project.track))]
+            if parent != node and not project.is_ancestor(node.projectid, parent.projectid):
+                node.move(parent)
+
+        # cached sizes are kept right, and some are cached newly.
+        for projectid, size in project.sizes.items():
+            assert size == brute_size(projectid), projectid
+
+        projectid = rnd.choice(list(project.track))
+        assert project.subtree_size(projectid) == brute_size(projectid)
+
+    assert wf.root.subtree_size == len(server.index())
+    assert_synced(wf, server)
+
+
+def test_get_timestamps():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    nodes = [project["n.0"], project["n.1"], project["n.0.1"]]
+    values = [node.raw.get("cp") for node in nodes]
+    assert values == [50, None, None]
+
+    assert project.get_timestamps(nodes, "lm", CLIENT_TIMESTAMP) == [100, 101, 101]
+    assert project.get_timestamps(nodes, "cp", EPOCH_TIMESTAMP) == [DATE_JOINED + 50, None, None]
+    converted = project.get_timestamps([node.raw for node in nodes])
+    assert converted == [datetime.fromtimestamp(DATE_JOINED + value) for value in (100, 101, 101)]
+    assert converted == [node.last_modified for node in nodes]
+    assert converted[1] is converted[2]
+
+    with pytest.raises(ValueError):
+        project.get_timestamps(nodes, kind="unknown")
+
+    node = nodes[0]
+    assert node.get_timestamp("cp", EPOCH_TIMESTAMP) == DATE_JOINED + 50
+    assert node.get_timestamp("cp", CLIENT_TIMESTAMP) == 50
+    assert nodes[1].completed_at is None
+
+
+def test_cache_timestamps():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    project.cache_timestamps = True
+    node = project["n.1"]
+
+    first = node.last_modified
+    assert node.last_modified is first
+
+    node.edit("changed")
+    assert node.last_modified is not first
+    assert node.last_modified > first
+
+    node.complete()
+    assert node.completed_at == project.get_python_timestamp(node.raw["cp"])
+
+    # refreshed raw value is not served from the cache.
+    server.index()["n.1"]["lm"] = 5
+    wf.init()
+    assert node.last_modified == project.get_python_timestamp(5)
@@ -0,0 +1,97 @@
+import pytest
+
+from fakewf import fake_session
+from wfapi.search import parse_query, Term, Tag, And, Or
+
+TREE = [
+    {"id": "a", "nm": "Groceries #shop", "ch": [
+        {"id": "a1", "nm": "apple", "no": "red fruit"},
+        {"id": "a2", "nm": "bread @bob", "cp": 10},
+        {"id": "a3", "nm": "Milk and eggs", "ch": [
+            {"id": "a31", "nm": "eggs"},
+        ]},
+    ]},
+    {"id": "b", "nm": "Work", "ch": [
+        {"id": "b1", "nm": "report #urgent", "lm": 0},
+        {"id": "b2", "nm": "meeting with @bob", "cp": 20, "ch": [
+            {"id": "b21", "nm": "agenda: apple pie"},
+        ]},
+    ]},
+    {"id": "c", "nm": "\"quoted phrase\" here"},
+]
+
+
+def search_ids(node, pattern):
+    return [found.projectid for found in node.search(pattern)]
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("x", "And([Term('x')])"),
+    ("a b", "And([Term('a'), Term('b')])"),
+    ("a OR b c", "And([Or([Term('a'), Term('b')]), Term('c')])"),
+    ("a OR b OR c", "And([Or([Term('a'), Term('b'), Term('c')])])"),
+    ("OR a", "And([Term('or'), Term('a')])"),
+    ('"two words" -x', "And([Term('two words'), Not(Term('x'))])"),
+    ("#Tag @bob", "And([Tag('#tag'), Tag('@bob')])"),
+    ("is:complete -is:completed", "And([Completed(), Not(Completed())])"),
+    ("last-changed:2h last-changed:3", "And([LastChanged(7200), LastChanged(259200)])"),
+    ("last-changed:x", "And([Term('last-changed:x')])"),
+])
+def test_parse_query(pattern, expected):
+    assert repr(parse_query(pattern)) == f"Query({expected})"
+
+
+def test_query_plan():
+    query = parse_query('a -b "c d" OR #e is:complete')
+    assert [type(clause) for clause in query.path_clauses] == [Term, Term, Term, Tag]
+    assert [clause.slot for clause in query.path_clauses] == [0, 1, 2, 3]
+    assert query.prune_slots == [1]
+    assert query.use_tags
+    assert not parse_query("a b").use_tags
+    assert isinstance(query.root, And) and isinstance(query.root.clauses[2], Or)
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("apple", ["a1", "b21"]),
+    ("APPLE", ["a1", "b21"]),
+    ("fruit", ["a1"]),
+    ("groceries", ["a", "a1", "a2", "a3", "a31"]),
+    ("groceries eggs", ["a3", "a31"]),
+    ("groceries -milk", ["a", "a1", "a2"]),
+    ("eggs OR report", ["a3", "a31", "b1"]),
+    ("#shop", ["a", "a1", "a2", "a3", "a31"]),
+    ("#sho", []),
+    ("@bob", ["a2", "b2", "b21"]),
+    ("is:complete", ["a2", "b2"]),
+    ("-is:complete @bob", ["b21"]),
+    ('"quoted phrase"', ["c"]),
+    ('"milk and"', ["a3", "a31"]),
+    ("nothing", []),
+])
+def test_search(pattern, expected):
+    wf, server = fake_session(children=TREE)
+    assert search_ids(wf.root, pattern) == expected
+
+
+def test_search_scope():
+    wf, server = fake_session(children=TREE)
+    # scope node is not a part of the search path.
+    assert search_ids(wf.main["a"], "groceries") == []
+    assert search_ids(wf.main["a"], "eggs") == ["a3", "a31"]
+    assert search_ids(wf.main["b2"], "apple") == ["b21"]
+
+
+def test_search_last_changed():
+    wf, server = fake_session(children=TREE)
+    project = wf.main
+    assert search_ids(wf.root, "last-changed:1") == []
+
+    project["b2"].edit("meeting")
+    assert search_ids(wf.root, "last-changed:1") == ["b2"]
+    assert search_ids(wf.root, "last-changed:1 -is:complete") == []
+
+
+def test_search_lazy():
+    wf, server = fake_session(children=TREE, lazy=True)
+    assert search_ids(wf.root, "eggs") == ["a3", "a31"]
+    assert wf.main["a31"].parentid == "a3"
@@ -0,0 +1,69 @@
+import random
+
+from fakewf import fake_session, assert_synced, make_children
+from wfapi.store import ColumnarStore, ColumnarProject, Row
+
+
+def test_store_round_trip():
+    raw = {"id": "None", "ch": make_children(3, 3)}
+    store = ColumnarStore()
+    row = store.load(raw)
+
+    assert store.to_json(row) == raw
+    assert len(store) == 1 + 3 + 9 + 27
+
+    view = Row(store, store.rows["n.0"])
+    assert view["nm"] == "name n.0 #tag0 @p0" and view["cp"] == 50
+    assert "no" not in Row(store, store.rows["n.1"])
+    assert [child["id"] for child in view["ch"]] == ["n.0.0", "n.0.1", "n.0.2"]
+    assert view == store.to_json(view.row)
+
+    view["nm"] = "changed"
+    view["extra"] = 1
+    assert store.to_json(view.row)["nm"] == "changed" and view["extra"] == 1
+
+    ch = view["ch"]
+    del ch[1]
+    ch.insert(0, {"id": "new", "nm": "x"})
+    assert [child["id"] for child in view["ch"]] == ["new", "n.0.0", "n.0.2"]
+
+
+def test_store_reuses_rows():
+    store = ColumnarStore()
+    root = store.load({"id": "None", "ch": make_children(2, 2)})
+    row = store.rows["n.0"]
+    store.unlink(row)
+    store.release(row)
+    assert "n.0" not in store and "n.0.1" not in store
+
+    new = store.load({"id": "other"})
+    assert new in (row, store.rows["other"])
+    store.link(root, 0, new)
+    assert store.to_json(root)["ch"][0] == {"id": "other"}
+
+
+def test_columnar_project():
+    wf, server = fake_session(4, 3, project_class=ColumnarProject)
+    project = wf.main
+    assert isinstance(project.root.raw, Row)
+    assert dict(project.track) == {
+        projectid: (None if parent is None else parent["id"])
+        for projectid, parent in ((projectid, server.parent_of(projectid)) for projectid in server.index())
+    }
+
+    rnd = random.Random(2)
+    for i in range(40):
+        node = rnd.choice(list(project.root.walk()))
+        action = rnd.random()
+        if action < 0.4:
+            node.create(priority=rnd.choice([0, -1])).edit(f"new {i}")
+        elif action < 0.6 and node is not project.root:
+            node.delete()
+        elif action < 0.8:
+            node.edit(f"edit {i}", description="memo")
+        else:
+            node.complete()
+
+        assert_synced(wf, server)
+
+    assert len(project) == len(server.index())
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from fakewf import fake_session, make_children
+from wfapi.stream import StreamDecoder, TrackBuilder, ROOT_PROJECT_CHILDREN_PATH
+from wfapi.traverse import POST_ORDER, traverse
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def sample_document():
+    children = make_children(3, 3)
+    children[0]["nm"] = "유니코드 ☃ \"quoted\" \\ name"
+    children[1]["lm"] = 12345.5e+3
+    children[2]["x"] = [1, -2.5e-3, True, None, {"a": []}]
+    return {
+        "globals": {"USER_ID": "1"},
+        "projectTreeData": {
+            "clientId": "client",
+            "mainProjectTreeInfo": {
+                "rootProject": None,
+                "rootProjectChildren": children,
+                "initialMostRecentOperationTransactionId": "123",
+            },
+            "auxiliaryProjectTreeInfos": [],
+        },
+        "number": 1234567,
+    }
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+@pytest.mark.parametrize("as_bytes", [True, False])
+def test_decode_chunks(size, as_bytes):
+    document = sample_document()
+    data = json.dumps(document, ensure_ascii=False, indent=1)
+    if as_bytes:
+        data = data.encode()
+
+    nodes = []
+    result = StreamDecoder(chunked(data, size), on_node=nodes.append).decode()
+    assert result == document
+
+    tree = document["projectTreeData"]["mainProjectTreeInfo"]["rootProjectChildren"]
+    expected = [raw["id"] for root in tree for _, raw, _ in traverse(root, POST_ORDER)]
+    assert [raw["id"] for raw in nodes] == expected
+
+
+def test_decode_errors():
+    with pytest.raises(json.JSONDecodeError):
+        StreamDecoder(chunked('{"a": [1, 2', 3)).decode()
+
+    with pytest.raises(json.JSONDecodeError):
+        StreamDecoder(['{"a": 1} 2']).decode()
+
+    assert StreamDecoder(["{}"]).decode() == {}
+    assert StreamDecoder(['{"a": {"b": []}}'], tree_path=("a", "b")).decode() == {"a": {"b": []}}
+
+
+def test_track_builder():
+    document = sample_document()
+    builder = TrackBuilder()
+    data = json.dumps(document)
+    result = StreamDecoder(chunked(data, 5), on_node=builder).decode()
+
+    tree = result
+    for key in ROOT_PROJECT_CHILDREN_PATH:
+        tree = tree[key]
+
+    track, raw_index = builder.finish(tree)
+    for root in tree:
+        for parentid, raw, _ in traverse(root):
+            assert raw_index[raw["id"]] is raw
+            assert track[raw["id"]] == (parentid or "None")
+
+
+@pytest.mark.parametrize("size", [1, 13, 1000])
+def test_stream_session(size):
+    wf, server = fake_session(4, 3)
+    wf_stream, _ = fake_session(4, 3, stream=True)
+    wf_stream.browser.chunk_size = size
+    wf_stream.init()
+
+    assert wf_stream.main.track == wf.main.track
+    assert wf_stream.main.raw_index == wf.main.raw_index
+    assert wf_stream.main.indexed
+    for projectid, raw in wf_stream.main.raw_index.items():
+        assert wf_stream.main[projectid].raw is raw
@@ -0,0 +1,46 @@
+from fakewf import fake_session, make_children
+from wfapi.traverse import PRE_ORDER, POST_ORDER, BREADTH_FIRST, traverse
+
+
+def recursive(raw, depth=0):
+    yield raw["id"], depth
+    for child in raw.get("ch", ()):
+        yield from recursive(child, depth + 1)
+
+
+def test_orders():
+    root = {"id": "None", "ch": make_children(3, 3)}
+
+    assert [(raw["id"], depth) for _, raw, depth in traverse(root)] == list(recursive(root))
+
+    post = [raw["id"] for _, raw, _ in traverse(root, POST_ORDER)]
+    assert post.index("n.0.0.0") < post.index("n.0.0") < post.index("n.0") < post.index("None")
+    assert sorted(post) == sorted(projectid for projectid, _ in recursive(root))
+
+    depths = [depth for _, _, depth in traverse(root, BREADTH_FIRST)]
+    assert depths == sorted(depths)
+
+    parents = {raw["id"]: parentid for parentid, raw, _ in traverse(root)}
+    assert parents["n.1.2"] == "n.1" and parents["None"] is None
+
+
+def test_deep_tree():
+    raw = root = {"id": "None"}
+    for i in range(5000):
+        child = {"id": str(i)}
+        raw["ch"] = [child]
+        raw = child
+
+    for order in (PRE_ORDER, POST_ORDER, BREADTH_FIRST):
+        assert sum(1 for _ in traverse(root, order)) == 5001
+
+
+def test_walk():
+    wf, server = fake_session(3, 3)
+    node = wf.main["n.1"]
+
+    assert [n.projectid for n in node.walk(max_depth=1)] == ["n.1", "n.1.0", "n.1.1", "n.1.2"]
+    assert [raw["id"] for raw in node.walk_raw(order=POST_ORDER, max_depth=1)][-1] == "n.1"
+
+    pruned = [n.projectid for n in node.walk(prune=lambda n: n.projectid == "n.1.0")]
+    assert "n.1.0" in pruned and "n.1.0.0" not in pruned and "n.1.1.0" in pruned
@@ -0,0 +1,146 @@
+import pytest
+
+from fakewf import fake_session, assert_synced
+from test_operation import sent_operations
+from wfapi.error import WFOverflowError, WFRuntimeError
+from wfapi.store import ColumnarProject
+
+SPEC = {"name": "top", "description": "memo", "children": [
+    {"name": "a", "completed": True},
+    {"name": "b", "children": [{"name": "b1"}, {"name": "b2", "children": [{"name": "b21"}]}]},
+    {},
+]}
+
+MODES = [
+    pytest.param(False, None, id="echo"),
+    pytest.param(True, None, id="optimistic"),
+    pytest.param(False, ColumnarProject, id="echo-columnar"),
+    pytest.param(True, ColumnarProject, id="optimistic-columnar"),
+]
+
+
+def session(optimistic, project_class, *args):
+    wf, server = fake_session(*args, project_class=project_class)
+    wf.main.optimistic = optimistic
+    return wf, server
+
+
+def tree_of(node):
+    result = {"name": node.name or None}
+    if node.description:
+        result["description"] = node.description
+
+    if node.raw.get("cp"):
+        result["completed"] = True
+
+    children = [tree_of(child) for child in node]
+    if children:
+        result["children"] = children
+
+    return result
+
+
+@pytest.mark.parametrize("optimistic, project_class", MODES)
+def test_create_tree(optimistic, project_class):
+    wf, server = session(optimistic, project_class, 3, 2)
+    project = wf.main
+    top = project["n.1"].create_tree(SPEC, priority=1)
+
+    assert project["n.1"].raw["ch"][1]["id"] == top.projectid
+    assert tree_of(top) == {"name": "top", "description": "memo", "children": [
+        {"name": "a", "completed": True},
+        {"name": "b", "children": [{"name": "b1"}, {"name": "b2", "children": [{"name": "b21"}]}]},
+        {"name": None},
+    ]}
+    assert server.names(top.projectid) == ["a", "b", ""]
+
+    # every created node is the cached node of the project.
+    for node in top.walk():
+        assert project[node.projectid] is node
+        assert project.raw_index[node.projectid]["nm"] == node.raw["nm"]
+
+    tops = wf.root.create_tree([{"name": "x"}, {"name": "y"}])
+    assert [node.name for node in tops] == ["x", "y"]
+    assert server.names()[-2:] == ["x", "y"]
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("optimistic, project_class", MODES)
+def test_create_tree_and_delete(optimistic, project_class):
+    wf, server = session(optimistic, project_class, 3, 2)
+    project = wf.main
+    before = set(project.track)
+    with project.transaction():
+        top = wf.root.create_tree(SPEC)
+        created = list(top.walk())
+        kept = wf.root.create_tree({"name": "kept"})
+        top.delete()
+
+    # create and delete of the tree are cancelled, and the local insert is undone.
+    assert all(projectid != top.projectid for _, projectid in sent_operations(server))
+    assert set(project.track) == before | {kept.projectid}
+    assert all(node.projectid not in project for node in created)
+    assert server.names()[-1] == "kept"
+    assert_synced(wf, server)
+
+    # rows of the cancelled nodes are reused without aliasing the new nodes.
+    nodes = [wf.root.create() for _ in range(10)]
+    for i, node in enumerate(nodes):
+        node.edit(f"new {i}")
+
+    assert [node.name for node in nodes] == [f"new {i}" for i in range(10)]
+    assert len({node.projectid for node in nodes}) == 10
+    assert kept.name == "kept"
+    assert_synced(wf, server)
+
+
+def test_create_tree_under_pending():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    with project.transaction():
+        node = wf.root.create()
+        node.edit("parent")
+        node.create_tree([{"name": "a"}, {"name": "b", "children": [{"name": "c"}]}])
+
+    assert tree_of(node) == {"name": "parent", "children": [
+        {"name": "a"}, {"name": "b", "children": [{"name": "c"}]}]}
+    assert_synced(wf, server)
+
+
+@pytest.mark.parametrize("optimistic, project_class", MODES)
+def test_create_tree_split(optimistic, project_class):
+    wf, server = session(optimistic, project_class, 2, 1)
+    project = wf.main
+    project.transaction_size = 4
+    spec = [{"name": f"t{i}", "children": [{"name": f"t{i}.{j}"} for j in range(3)]} for i in range(3)]
+    wf.root.create_tree(spec)
+
+    assert len(server.requests) == 1
+    assert [len(transaction["operations"]) for transaction in server.requests[0]] == [4, 4, 4, 4, 4, 4]
+    assert server.names()[-3:] == ["t0", "t1", "t2"]
+    assert_synced(wf, server)
+
+
+def test_create_tree_quota():
+    wf, server = fake_session(2, 1)
+    project = wf.main
+    project.quota.total = project.quota.used + 3
+    with pytest.raises(WFOverflowError):
+        wf.root.create_tree({"name": "a", "children": [{}, {}, {}]})
+
+    assert not server.requests and not project.operations
+    wf.root.create_tree({"name": "a", "children": [{}, {}]})
+    assert project.quota.is_full()
+    assert_synced(wf, server)
+
+
+def test_create_tree_rollback():
+    wf, server = session(True, None, 3, 2)
+    project = wf.main
+    before = set(project.track)
+    server.fail_next = "rejected"
+    with pytest.raises(WFRuntimeError):
+        wf.root.create_tree(SPEC)
+
+    assert set(project.track) == before
+    assert_synced(wf, server)
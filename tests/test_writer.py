@@ -0,0 +1,94 @@
+import pytest
+
+from fakewf import fake_session, assert_synced
+from wfapi.error import WFRuntimeError
+from wfapi.lock import RWLock
+
+
+def test_writer_mode():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    project["n.0"].edit("before")
+    with project.transaction():
+        project["n.1"].edit("queued before writer")
+        writer = wf.start_writer(max_operations=1000, max_delay=1000)
+        assert wf.start_writer() is writer
+
+    assert isinstance(project.lock, RWLock)
+    assert project.optimistic and project.concurrent
+    assert project["n.1"].name == "queued before writer"
+
+    project["n.2"].edit("after")
+    assert project["n.2"].name == "after"
+    assert server.names()[2] != "after"
+
+    assert len(wf.flush()) == 2
+    assert server.names()[:3] == ["before", "queued before writer", "after"]
+    wf.close()
+    assert wf.writer is None
+    assert_synced(wf, server)
+
+
+def test_writer_order():
+    wf, server = fake_session(3, 2)
+    wf.start_writer(max_operations=1000, max_delay=1000)
+
+    first = wf.root.create()
+    first.edit("first")
+    second = wf.root.create()
+    second.edit("second")
+    third = wf.root.create()
+    third.delete()
+
+    with wf.pipeline():
+        fourth = wf.root.create()
+        fourth.edit("fourth")
+        fourth.create().edit("child")
+
+    assert not server.requests[1:]
+    wf.close()
+    assert server.names()[-3:] == ["first", "second", "fourth"]
+    assert [child.name for child in wf.root][-3:] == ["first", "second", "fourth"]
+    assert server.names(fourth.projectid) == ["child"]
+    assert_synced(wf, server)
+
+
+def test_writer_error():
+    wf, server = fake_session(3, 2)
+    project = wf.main
+    wf.start_writer(max_operations=1000, max_delay=1000)
+
+    server.fail_next = "rejected"
+    node = wf.root.create()
+    node.edit("rejected")
+    projectid = node.projectid
+    project["n.1"].edit("sent")
+    assert projectid in project
+
+    with pytest.raises(WFRuntimeError):
+        wf.flush()
+
+    assert projectid not in project
+    assert server.names()[1] == "sent"
+    wf.close()
+    assert_synced(wf, server)
+
+
+def test_writer_by_size():
+    wf, server = fake_session(3, 2)
+    writer = wf.start_writer(max_operations=3, max_delay=1000)
+    for i in range(3):
+        wf.main[f"n.{i}"].edit(f"edit {i}")
+
+    # sent by the background thread without flush.
+    for _ in range(500):
+        if server.requests:
+            break
+
+        writer.thread.join(0.01)
+
+    assert len(server.requests) == 1
+
+    wf.close()
+    assert server.names() == ["edit 0", "edit 1", "edit 2"]
+    assert_synced(wf, server)
@@ -0,0 +1,306 @@
+import asyncio
+import functools
+from concurrent.futures import Future
+from queue import Queue
+from typing import List, Type
+from urllib.parse import urlencode, urljoin
+
+from .browser import STREAM_CHUNK_SIZE, get_default_workflowy_url
+from .error import WFLoginError
+from .project import Project
+from .workflowy import Workflowy
+
+__all__ = ["AsyncBrowser", "AiohttpBrowser", "AsyncProject", "AsyncWorkflowy", "PendingCommit"]
+
+
+class AsyncBrowser:
+    def __init__(self, base_url=None):
+        self.base_url = get_default_workflowy_url(base_url)
+
+    async def open(self, url, _raw=False, _query=None, **kwargs):
+        raise NotImplementedError
+
+    async def open_stream(self, url, _query=None, **kwargs):
+        """
+        :return: response and async iterator of response body chunks (bytes or str)
+        """
+        raise NotImplementedError
+
+    def set_cookie(self, name, value):
+        raise NotImplementedError
+
+    def __getitem__(self, url):
+        return functools.partial(self.open, url)
+
+    async def close(self):
+        pass
+
+
+class AiohttpBrowser(AsyncBrowser):
+    """
+    AsyncBrowser by aiohttp. (pip install wfapi[aiohttp])
+    """
+
+    def __init__(self, base_url=None):
+        super().__init__(base_url=base_url)
+        self.session = None
+        self.cookies = {}
+
+    def _get_session(self):
+        # ClientSession should be created in the event loop.
+        if self.session is None:
+            import aiohttp
+            self.session = aiohttp.ClientSession(cookies=self.cookies)
+
+        return self.session
+
+    async def _request(self, url, _query=None, **kwargs):
+        url = urljoin(self.base_url, url)
+
+        data = None
+        if kwargs:
+            data = urlencode(kwargs).encode()
+
+        method = 'POST' if data else 'GET'
+
+        return await self._get_session().request(
+            method=method,
+            url=url,
+            params=_query,
+            data=data,
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+        )
+
+    async def open(self, url, _raw=False, _query=None, **kwargs):
+        res = await self._request(url, _query=_query, **kwargs)
+        async with res:
+            if _raw:
+                content = (await res.read()).decode('utf-8', 'replace')
+            else:
+                content = await res.json(content_type=None)
+
+        return res, content
+
+    async def open_stream(self, url, _query=None, **kwargs):
+        res = await self._request(url, _query=_query, **kwargs)
+        res.raise_for_status()
+
+        async def iter_content():
+            async with res:
+                async for chunk in res.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    yield chunk
+
+        return res, iter_content()
+
+    def set_cookie(self, name, value):
+        self.cookies[name] = value
+        if self.session is not None:
+            self.session.cookie_jar.update_cookies({name: value})
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class PendingCommit:
+    """
+    futures of the committed transactions, await to send them.
+    """
+
+    def __init__(self, workflowy: "AsyncWorkflowy", futures: List[Future]):
+        self.workflowy = workflowy
+        self.futures = futures
+
+    def __iter__(self):
+        return iter(self.futures)
+
+    def __await__(self):
+        return self._wait().__await__()
+
+    async def _wait(self):
+        await self.workflowy.flush()
+        return [future.result() for future in self.futures]
+
+
+class AsyncContext:
+    """
+    ``with`` runs the sync context (like Project.transaction),
+    ``async with`` also sends the queued transactions at the end.
+    """
+
+    def __init__(self, workflowy: "AsyncWorkflowy", context=None):
+        self.workflowy = workflowy
+        self.context = context
+
+    def __enter__(self):
+        return None if self.context is None else self.context.__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return None if self.context is None else self.context.__exit__(exc_type, exc_val, exc_tb)
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        suppress = self.__exit__(exc_type, exc_val, exc_tb)
+        if exc_type is None:
+            await self.workflowy.flush()
+
+        return suppress
+
+
+class AsyncProject(Project):
+    """
+    Project of AsyncWorkflowy.
+
+    operations are queued by commit (like Node.edit), and sent by
+    ``await project.commit()``, ``async with project.transaction()``
+    or ``await session.flush()``.
+    """
+
+    def transaction(self):
+        return AsyncContext(self.workflowy, super().transaction())
+
+    def commit(self) -> PendingCommit:
+        return PendingCommit(self.workflowy, super().commit())
+
+
+class AsyncWorkflowy(Workflowy):
+    """
+    asyncio version of Workflowy, the tree is kept by AsyncProject.
+
+    >>> session = AsyncWorkflowy()
+    >>> await session.login(sessionid)
+    >>> await session.init()
+    >>> async with session.transaction():
+    ...     session.root.create().edit("hello")
+    >>> await session.close()
+    """
+    project_class = AsyncProject
+
+    def __init__(self, share_id=None, browser: AsyncBrowser = None,
+                 project_class: Type[Project] = None, lazy=False, stream=False):
+        self._init_state(
+            share_id=share_id,
+            browser=AiohttpBrowser() if browser is None else browser,
+            project_class=project_class,
+            lazy=lazy,
+            stream=stream,
+        )
+
+        self.async_send_lock = None  # type: asyncio.Lock
+
+    async def login(self, username_or_sessionid, password=None, use_ajax_login=True):
+        if password is None:
+            session_id = username_or_sessionid
+            self.browser.set_cookie("sessionid", session_id)
+        else:
+            username = username_or_sessionid
+            if use_ajax_login:
+                res, data = await self.browser["ajax_login"](username=username,
+                                                             password=password)
+                self._check_login(data)
+            else:
+                res, data = await self.browser["accounts/login/"](
+                    username=username, password=password, next="", _raw=True)
+
+    async def init(self):
+        data, index = await self._get_initialization_data()
+        _, home_content = await self.browser[""](_raw=True)
+        self._load_initialization_data(data, index, home_content)
+
+    async def _get_initialization_data(self):
+        info = self._get_initialization_info()
+
+        async def get_initialization_data():
+            try:
+                if self.stream:
+                    return await self._decode_initialization_stream(info)
+
+                _, data = await self.browser["get_initialization_data"](_query=info)
+                return data, None
+            except Exception as e:
+                raise WFLoginError from e
+
+        try:
+            return await get_initialization_data()
+        except WFLoginError:
+            self.handle_logout()
+            return await get_initialization_data()
+
+    async def _decode_initialization_stream(self, info):
+        _, chunks = await self.browser.open_stream("get_initialization_data", _query=info)
+
+        # chunks are decoded by the worker thread while they arrive.
+        queue = Queue()
+        loop = asyncio.get_running_loop()
+        decoding = loop.run_in_executor(None, self._decode_initialization_chunks, iter(queue.get, None))
+        try:
+            async for chunk in chunks:
+                queue.put(chunk)
+                if decoding.done():
+                    # decoding error is raised below.
+                    break
+        except BaseException:
+            # stop the worker, and raise the error of the stream.
+            queue.put(None)
+            await asyncio.wait([decoding])
+            decoding.exception()
+            raise
+
+        queue.put(None)
+        return await decoding
+
+    async def _push_and_poll(self, transaction):
+        _, data = await self.browser["push_and_poll"](**self._get_push_and_poll_info(transaction))
+        return data
+
+    def push_transaction(self, project: Project, transaction) -> Future:
+        # always queued, sent by flush()
+        future = Future()
+        self.outbox.append((project, transaction, future))
+        return future
+
+    def is_deferred(self) -> bool:
+        return True
+
+    async def flush(self) -> list:
+        if self.async_send_lock is None:
+            self.async_send_lock = asyncio.Lock()
+
+        async with self.async_send_lock:
+            queued, self.outbox = self.outbox, []
+            if not queued:
+                return []
+
+            try:
+                response = await self._push_and_poll([transaction for _, transaction, _ in queued])
+            except Exception as e:
+                self._fail_queued(queued, e)
+                raise
+
+            futures = self._apply_results(queued, response)
+
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                raise error
+
+        return [future.result() for future in futures]
+
+    def pipeline(self):
+        # transactions are always queued until flush.
+        return AsyncContext(self)
+
+    def transaction(self):
+        return self.main.transaction()
+
+    def start_writer(self, max_operations=100, max_delay=None):
+        raise NotImplementedError("AsyncWorkflowy sends transactions by flush()")
+
+    async def close(self):
+        await self.flush()
+        await self.browser.close()
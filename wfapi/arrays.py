@@ -0,0 +1,111 @@
+from collections import namedtuple
+
+from .traverse import traverse
+
+if False:
+    from .project import Project
+
+__all__ = ["TreeArrays", "to_arrays", "to_datetime64", "to_epoch"]
+
+NAN = float('nan')
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("numpy is required for wfapi.arrays (pip install wfapi[numpy])") from e
+
+    return numpy
+
+
+class TreeArrays(namedtuple("TreeArrays", [
+    "ids", "parent", "depth", "child_count", "lm", "cp", "completed", "date_joined",
+])):
+    """
+    aligned numpy arrays of the project tree, in document order. (pre-order)
+
+    - ids: list of projectid (ids[0] is root)
+    - parent: int64 row of parent node, -1 for root
+    - depth: int32 depth from root (root is 0)
+    - child_count: int32 number of children
+    - lm, cp: float64 client timestamps, NaN for missing value
+    - completed: bool mask of completed nodes
+    - date_joined: offset of client timestamps (date_joined_timestamp_in_seconds)
+    """
+    __slots__ = ()
+
+    def to_epoch(self, client_timestamps):
+        return to_epoch(client_timestamps, self.date_joined)
+
+    def to_datetime64(self, client_timestamps):
+        return to_datetime64(client_timestamps, self.date_joined)
+
+    def lm_datetime64(self):
+        return self.to_datetime64(self.lm)
+
+    def cp_datetime64(self):
+        return self.to_datetime64(self.cp)
+
+
+def to_arrays(project: "Project") -> TreeArrays:
+    """
+    build TreeArrays of the project in one pass.
+    """
+    np = _import_numpy()
+
+    ids = []
+    rows = {}
+    parent = []
+    depths = []
+    child_count = []
+    lm = []
+    cp = []
+    for parentid, raw, depth in traverse(project.root.raw):
+        projectid = raw['id']
+        rows[projectid] = len(ids)
+        ids.append(projectid)
+        parent.append(-1 if parentid is None else rows[parentid])
+        depths.append(depth)
+
+        ch = raw.get('ch')
+        child_count.append(len(ch) if ch else 0)
+
+        value = raw.get('lm')
+        lm.append(NAN if value is None else value)
+        value = raw.get('cp')
+        cp.append(NAN if value is None else value)
+
+    cp = np.array(cp, dtype=np.float64)
+    return TreeArrays(
+        ids=ids,
+        parent=np.array(parent, dtype=np.int64),
+        depth=np.array(depths, dtype=np.int32),
+        child_count=np.array(child_count, dtype=np.int32),
+        lm=np.array(lm, dtype=np.float64),
+        cp=cp,
+        completed=~np.isnan(cp),
+        date_joined=project.status.date_joined_timestamp_in_seconds,
+    )
+
+
+def to_epoch(client_timestamps, date_joined):
+    """
+    client timestamps to float64 unix timestamps.
+    """
+    np = _import_numpy()
+    return np.asarray(client_timestamps, dtype=np.float64) + date_joined
+
+
+def to_datetime64(client_timestamps, date_joined):
+    """
+    client timestamps to datetime64[us] (UTC), NaT for NaN.
+    """
+    np = _import_numpy()
+    epoch = to_epoch(client_timestamps, date_joined)
+    missing = np.isnan(epoch)
+
+    micro = np.where(missing, 0, np.round(epoch * 1e6)).astype(np.int64)
+    result = micro.astype("datetime64[us]")
+    result[missing] = np.datetime64("NaT")
+    return result
@@ -9,6 +9,8 @@ from . import config
 
 __all__ = ["DefaultBrowser", "RequestsBrowser"]
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 def get_default_workflowy_url(base_url):
     if base_url is None:
@@ -24,6 +26,12 @@ class Browser:
     def open(self, url, _raw=False, _query=None, **kwargs):
         raise NotImplementedError
 
+    def open_stream(self, url, _query=None, **kwargs):
+        """
+        :return: response and iterator of response body chunks (bytes or str)
+        """
+        raise NotImplementedError
+
     def set_cookie(self, name, value):
         raise NotImplementedError
 
@@ -40,7 +48,7 @@ class RequestsBrowser(Browser):
         super().__init__(base_url=base_url)
         self.session = requests.Session()
 
-    def open(self, url, _raw=False, _query=None, **kwargs):
+    def _request(self, url, _query=None, _stream=False, **kwargs):
         url = urljoin(self.base_url, url)
 
         data = None
@@ -49,20 +57,29 @@ class RequestsBrowser(Browser):
 
         method = 'POST' if data else 'GET'
 
-        res = self.session.request(
+        return self.session.request(
             method=method,
             url=url,
             params=_query,
             data=data,
             headers={
                 "Content-Type": "application/x-www-form-urlencoded",
-            }
+            },
+            stream=_stream,
         )
 
+    def open(self, url, _raw=False, _query=None, **kwargs):
+        res = self._request(url, _query=_query, **kwargs)
         content = res.json() if not _raw else res.content.decode('utf-8', 'replace')
 
         return res, content
 
+    def open_stream(self, url, _query=None, **kwargs):
+        res = self._request(url, _query=_query, _stream=True, **kwargs)
+        res.raise_for_status()
+
+        return res, res.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+
     def set_cookie(self, name, value):
         self.session.cookies.set(name, value)
 
@@ -0,0 +1,560 @@
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Iterator, List, Set
+
+from .traverse import traverse
+
+if False:
+    from .node import Node
+    from .project import Project
+
+__all__ = ["Index", "FullTextIndex", "TagIndex", "TimestampIndex", "IntervalIndex"]
+
+WORD_REGEX = re.compile(r"\w+")
+TAG_REGEX = re.compile(r"(?<![\w#@])([#@][\w][\w\-]*)")
+
+
+class Index:
+    """
+    secondary index of the project, kept up to date by the project.
+
+    - add(parentid, raw): node is added (called for each node of added subtree)
+    - remove(raw): node is removed (called for each node of removed subtree)
+    - update(raw, old): node is edited, old is dict of previous values of changed keys.
+    - move(raw, old_parentid, parentid): subtree is moved (called for the top node only)
+    - rebuild(): project tree is reloaded.
+    """
+
+    def __init__(self):
+        self.project = None  # type: Project
+
+    def attach(self, project: "Project"):
+        self.project = project
+        self.rebuild()
+
+    def clear(self):
+        raise NotImplementedError
+
+    def rebuild(self):
+        self.clear()
+        for parentid, raw, _ in traverse(self.project.root.raw):
+            self.add(parentid, raw)
+
+    def add(self, parentid, raw):
+        raise NotImplementedError
+
+    def remove(self, raw):
+        raise NotImplementedError
+
+    def update(self, raw, old):
+        pass
+
+    def move(self, raw, old_parentid, parentid):
+        pass
+
+    def search_candidates(self, clause):
+        """
+        projectids of nodes which may match the search clause by itself.
+        (superset, used by wfapi.search.Query)
+
+        :return: None if the clause is not supported by this index.
+        """
+        return None
+
+
+def get_text(raw):
+    # searchable text of the node.
+    name = raw.get('nm') or ""
+    description = raw.get('no')
+    return (name + "\n" + description if description else name).lower()
+
+
+def get_tags(text) -> Set[str]:
+    return set(TAG_REGEX.findall(text))
+
+
+def get_words(text) -> Set[str]:
+    return set(WORD_REGEX.findall(text.lower())) if text else set()
+
+
+def _iter_prefix(words: List[str], prefix) -> Iterator[str]:
+    # words starting with prefix in the sorted list.
+    for i in range(bisect_left(words, prefix), len(words)):
+        word = words[i]
+        if not word.startswith(prefix):
+            break
+
+        yield word
+
+
+def _remove_sorted(words: List[str], word):
+    i = bisect_left(words, word)
+    if i < len(words) and words[i] == word:
+        del words[i]
+
+
+class FullTextIndex(Index):
+    """
+    inverted index of the words in name and description. (case insensitive)
+
+    >>> index = project.add_index(FullTextIndex())
+    >>> index.find("hello world")  # projectids in document order
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.postings = {}  # word -> set of projectid
+        self.vocabulary = None  # sorted words, built at first prefix lookup
+        self.reversed_vocabulary = None  # sorted reversed words, for suffix lookup
+
+    def clear(self):
+        self.postings.clear()
+        self.vocabulary = None
+        self.reversed_vocabulary = None
+
+    def add(self, parentid, raw):
+        projectid = raw['id']
+        for word in get_words(raw.get('nm')) | get_words(raw.get('no')):
+            self._add_word(word, projectid)
+
+    def remove(self, raw):
+        self._discard(raw['id'], get_words(raw.get('nm')) | get_words(raw.get('no')))
+
+    def update(self, raw, old):
+        if 'nm' not in old and 'no' not in old:
+            return
+
+        old_words = get_words(old.get('nm', raw.get('nm'))) | get_words(old.get('no', raw.get('no')))
+        new_words = get_words(raw.get('nm')) | get_words(raw.get('no'))
+
+        projectid = raw['id']
+        self._discard(projectid, old_words - new_words)
+        for word in new_words - old_words:
+            self._add_word(word, projectid)
+
+    def _add_word(self, word, projectid):
+        ids = self.postings.get(word)
+        if ids is None:
+            ids = self.postings[word] = set()
+            if self.vocabulary is not None:
+                insort(self.vocabulary, word)
+                insort(self.reversed_vocabulary, word[::-1])
+
+        ids.add(projectid)
+
+    def _discard(self, projectid, words: Iterable[str]):
+        for word in words:
+            ids = self.postings.get(word)
+            if ids is not None:
+                ids.discard(projectid)
+                if not ids:
+                    del self.postings[word]
+                    if self.vocabulary is not None:
+                        _remove_sorted(self.vocabulary, word)
+                        _remove_sorted(self.reversed_vocabulary, word[::-1])
+
+    def _get_vocabulary(self):
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+            self.reversed_vocabulary = sorted(word[::-1] for word in self.postings)
+
+        return self.vocabulary, self.reversed_vocabulary
+
+    def lookup(self, word) -> Set[str]:
+        """
+        projectids of nodes that have the exact word.
+        """
+        return self.postings.get(word.lower(), set())
+
+    def lookup_prefix(self, prefix) -> Set[str]:
+        """
+        projectids of nodes that have a word starting with prefix.
+        """
+        vocabulary, _ = self._get_vocabulary()
+        return self._union(_iter_prefix(vocabulary, prefix.lower()))
+
+    def lookup_suffix(self, suffix) -> Set[str]:
+        """
+        projectids of nodes that have a word ending with suffix.
+        """
+        _, reversed_vocabulary = self._get_vocabulary()
+        words = _iter_prefix(reversed_vocabulary, suffix.lower()[::-1])
+        return self._union(word[::-1] for word in words)
+
+    def _union(self, words) -> Set[str]:
+        postings = self.postings
+        ids = set()
+        for word in words:
+            ids |= postings[word]
+
+        return ids
+
+    def candidates(self, text) -> Set[str]:
+        """
+        projectids of nodes that may contain the text.
+        (superset of the nodes which really contain the text)
+
+        a word between other words in the text must be a whole word of the node,
+        the first word may be the end of a word, and the last word may be the start of a word.
+        only a single word text is looked up in the middle of words, by scanning the vocabulary.
+
+        :return: None if the text has no word.
+        """
+        text = text.lower()
+        matches = list(WORD_REGEX.finditer(text))
+        if not matches:
+            return None
+
+        lookups = []
+        for m in matches:
+            word = m.group()
+            starts = m.start() > 0  # the word of the node starts here.
+            ends = m.end() < len(text)  # the word of the node ends here.
+            if starts and ends:
+                lookups.append((0, word, self.lookup))
+            elif starts:
+                lookups.append((1, word, self.lookup_prefix))
+            elif ends:
+                lookups.append((1, word, self.lookup_suffix))
+            else:
+                lookups.append((2, word, self._lookup_infix))
+
+        # most selective lookup first.
+        lookups.sort(key=lambda item: (item[0], -len(item[1])))
+
+        result = None
+        for _, word, lookup in lookups:
+            ids = lookup(word)
+            result = set(ids) if result is None else result & ids
+            if not result:
+                break
+
+        return result
+
+    def _lookup_infix(self, word) -> Set[str]:
+        return self._union(token for token in self.postings if word in token)
+
+    def search_candidates(self, clause):
+        from .search import Term
+
+        if isinstance(clause, Term):
+            return self.candidates(clause.text)
+
+        return None
+
+    def find(self, text) -> List[str]:
+        """
+        projectids of nodes that contain the text in name or description,
+        in document order.
+        """
+        text = text.lower()
+        project = self.project
+        ids = self.candidates(text)
+        if ids is None:
+            ids = project.raw_index.keys()
+
+        raw_index = project.raw_index
+        found = [projectid for projectid in ids if text in get_text(raw_index[projectid])]
+        found.sort(key=project.document_key)
+        return found
+
+
+class TagIndex(Index):
+    """
+    index of #tag and @person in name and description. (case insensitive)
+
+    >>> index = project.add_index(TagIndex())
+    >>> index.find("#todo", scope=node)  # projectids in document order
+    >>> index.counts(scope=node)  # Counter of tags under the node
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tags = {}  # tag -> set of projectid
+
+    def clear(self):
+        self.tags.clear()
+
+    def add(self, parentid, raw):
+        projectid = raw['id']
+        for tag in get_tags(get_text(raw)):
+            self.tags.setdefault(tag, set()).add(projectid)
+
+    def remove(self, raw):
+        self._discard(raw['id'], get_tags(get_text(raw)))
+
+    def update(self, raw, old):
+        if 'nm' not in old and 'no' not in old:
+            return
+
+        old_raw = {
+            'nm': old.get('nm', raw.get('nm')),
+            'no': old.get('no', raw.get('no')),
+        }
+
+        old_tags = get_tags(get_text(old_raw))
+        new_tags = get_tags(get_text(raw))
+
+        projectid = raw['id']
+        self._discard(projectid, old_tags - new_tags)
+        for tag in new_tags - old_tags:
+            self.tags.setdefault(tag, set()).add(projectid)
+
+    def _discard(self, projectid, tags: Iterable[str]):
+        for tag in tags:
+            ids = self.tags.get(tag)
+            if ids is not None:
+                ids.discard(projectid)
+                if not ids:
+                    del self.tags[tag]
+
+    def search_candidates(self, clause):
+        from .search import Tag
+
+        if isinstance(clause, Tag):
+            return self.tags.get(clause.text, set())
+
+        return None
+
+    def _in_scope(self, ids, scope):
+        if scope is None:
+            return ids
+
+        project = self.project
+        scopeid = scope if isinstance(scope, str) else scope.projectid
+        return [projectid for projectid in ids if project.is_ancestor(scopeid, projectid)]
+
+    def find(self, tag, scope=None) -> List[str]:
+        """
+        projectids of nodes which have the tag, in document order.
+
+        :param scope: only nodes under the scope node (or projectid)
+        """
+        ids = self._in_scope(self.tags.get(tag.lower(), ()), scope)
+        return sorted(ids, key=self.project.document_key)
+
+    def count(self, tag, scope=None) -> int:
+        ids = self.tags.get(tag.lower(), ())
+        return len(ids if scope is None else self._in_scope(ids, scope))
+
+    def counts(self, scope=None) -> Counter:
+        """
+        number of nodes for each tag.
+        """
+        return Counter({
+            tag: count
+            for tag, count in ((tag, self.count(tag, scope)) for tag in self.tags)
+            if count
+        })
+
+
+class TimestampIndex(Index):
+    """
+    sorted index of client timestamp, 'lm' (last modified) or 'cp' (completed).
+
+    >>> modified = project.add_index(TimestampIndex('lm'))
+    >>> modified.nodes(start=datetime(2017, 10, 1))  # modified since
+    >>> completed = project.add_index(TimestampIndex('cp'))
+    >>> completed.range(start, end)  # completed between start and end
+    """
+
+    def __init__(self, key='lm'):
+        super().__init__()
+        if key not in ('lm', 'cp'):
+            raise ValueError(f"unsupported timestamp key: {key!r}")
+
+        self.key = key
+        self.entries = []  # sorted list of (client timestamp, projectid)
+
+    def clear(self):
+        self.entries.clear()
+
+    def rebuild(self):
+        key = self.key
+        self.entries = sorted(
+            (raw[key], raw['id'])
+            for _, raw, _ in traverse(self.project.root.raw)
+            if raw.get(key) is not None
+        )
+
+    def add(self, parentid, raw):
+        value = raw.get(self.key)
+        if value is not None:
+            insort(self.entries, (value, raw['id']))
+
+    def remove(self, raw):
+        self._discard(raw.get(self.key), raw['id'])
+
+    def update(self, raw, old):
+        if self.key in old:
+            self._discard(old[self.key], raw['id'])
+            self.add(None, raw)
+
+    def _discard(self, value, projectid):
+        if value is None:
+            return
+
+        entries = self.entries
+        entry = (value, projectid)
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    def _to_client_timestamp(self, value):
+        if isinstance(value, datetime):
+            return self.project.get_client_timestamp(value.timestamp())
+
+        return value
+
+    def range(self, start=None, end=None) -> Iterator[str]:
+        """
+        projectids of nodes with start <= timestamp < end, in timestamp order.
+
+        :param start: datetime or client timestamp (None for unbounded)
+        :param end: datetime or client timestamp (None for unbounded)
+        """
+        entries = self.entries
+        lo = 0 if start is None else bisect_left(entries, (self._to_client_timestamp(start),))
+        hi = len(entries) if end is None else bisect_left(entries, (self._to_client_timestamp(end),))
+        for _, projectid in entries[lo:hi]:
+            yield projectid
+
+    def nodes(self, start=None, end=None) -> Iterator["Node"]:
+        find_node = self.project.find_node
+        for projectid in self.range(start, end):
+            yield find_node(projectid)
+
+    def search_candidates(self, clause):
+        from .search import Completed, LastChanged
+
+        if self.key == 'lm' and isinstance(clause, LastChanged):
+            return set(self.range(start=clause.since))
+        elif self.key == 'cp' and isinstance(clause, Completed):
+            return {projectid for _, projectid in self.entries}
+
+        return None
+
+
+class IntervalIndex(Index):
+    """
+    nested interval (euler tour) labels of the tree: (start, end) per node,
+    ancestor's interval contains the intervals of all its descendants.
+
+    labels are numbered with gaps, new subtree is labeled in the gap between
+    its siblings, and the smallest enclosing subtree is relabeled when the gap is full.
+
+    when attached, Project.is_ancestor and Project.document_key use this index.
+
+    >>> intervals = project.add_index(IntervalIndex())
+    >>> intervals.is_ancestor(ancestorid, projectid)  # O(1)
+    """
+
+    GAP = 1 << 32
+
+    def __init__(self):
+        super().__init__()
+        self.intervals = {}  # projectid -> (start, end)
+        self.relabel_count = 0
+
+    def clear(self):
+        self.intervals.clear()
+
+    def rebuild(self):
+        self.clear()
+        root = self.project.root.raw
+        size = sum(1 for _ in traverse(root))
+        self._label(root, 0, (2 * size + 1) * self.GAP)
+
+    def add(self, parentid, raw):
+        if raw['id'] in self.intervals:
+            # labeled with the top of the added subtree.
+            return
+
+        project = self.project
+        projectid = raw['id']
+        while parentid is not None:
+            lo, hi = self._get_bounds(parentid, projectid)
+            if self._label(raw, lo, hi):
+                return
+
+            self.relabel_count += 1
+            projectid, parentid = parentid, project.track[parentid]
+            raw = project.raw_index[projectid]
+
+        self.relabel_count += 1
+        self.rebuild()
+
+    def remove(self, raw):
+        self.intervals.pop(raw['id'], None)
+
+    def move(self, raw, old_parentid, parentid):
+        # the labels depend on the position, relabel the moved subtree.
+        del self.intervals[raw['id']]
+        self.add(parentid, raw)
+
+    def _get_bounds(self, parentid, projectid):
+        # free labels for the child, between the siblings.
+        project = self.project
+        intervals = self.intervals
+        lo, hi = intervals[parentid]
+
+        ch = project.raw_index[parentid]['ch']
+        priority = project._find_priority(parentid, projectid)
+        if priority > 0:
+            lo = intervals[ch[priority - 1]['id']][1]
+
+        if priority + 1 < len(ch):
+            hi = intervals[ch[priority + 1]['id']][0]
+
+        return lo, hi
+
+    def _label(self, top_raw, lo, hi) -> bool:
+        # label the subtree evenly between lo and hi (exclusive).
+        size = sum(1 for _ in traverse(top_raw))
+        step = (hi - lo) // (2 * size + 1)
+        if step < 1:
+            return False
+
+        intervals = self.intervals
+        label = lo
+        stack = [(top_raw, None)]
+        while stack:
+            raw, start = stack.pop()
+            label += step
+            if start is not None:
+                intervals[raw['id']] = (start, label)
+                continue
+
+            stack.append((raw, label))
+            ch = raw.get('ch')
+            if ch:
+                stack.extend((child, None) for child in reversed(ch))
+
+        return True
+
+    def is_ancestor(self, ancestorid, projectid) -> bool:
+        """
+        check the ancestorid is a proper ancestor of projectid.
+        """
+        start, end = self.intervals[ancestorid]
+        child_start, child_end = self.intervals[projectid]
+        return start < child_start and child_end < end
+
+    def document_key(self, projectid):
+        """
+        sort key of the node in document order. (pre-order)
+        """
+        return self.intervals[projectid][0]
+
+    def in_subtree(self, ids, projectid) -> List[str]:
+        """
+        filter ids by the subtree of projectid. (not including itself)
+        """
+        start, end = self.intervals[projectid]
+        intervals = self.intervals
+        return [
+            childid for childid in ids
+            if start < intervals[childid][0] < end
+        ]
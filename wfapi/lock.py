@@ -0,0 +1,110 @@
+import threading
+from contextlib import contextmanager
+
+__all__ = ["RWLock", "NullLock"]
+
+
+class RWLock:
+    """
+    reader/writer lock: many readers or one writer.
+
+    - the writer can take the write lock and read lock again.
+    - the reader can take the read lock again, even if a writer is waiting.
+    - waiting writer blocks new readers.
+    - read lock can't be upgraded to write lock. (RuntimeError)
+
+    >>> lock = RWLock()
+    >>> with lock.read():
+    ...     pass
+    >>> with lock.write():
+    ...     pass
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = None  # thread ident
+        self.waiting_writers = 0
+        self.local = threading.local()  # read level of each thread
+
+    @contextmanager
+    def read(self):
+        if self.writer == threading.get_ident():
+            # only this thread can change it.
+            yield
+            return
+
+        local = self.local
+        level = getattr(local, "level", 0)
+        if not level:
+            with self.condition:
+                while self.writer is not None or self.waiting_writers:
+                    self.condition.wait()
+
+                self.readers += 1
+
+        local.level = level + 1
+        try:
+            yield
+        finally:
+            local.level = level
+            if not level:
+                with self.condition:
+                    self.readers -= 1
+                    if not self.readers:
+                        self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        ident = threading.get_ident()
+        if self.writer == ident:
+            yield
+            return
+
+        if getattr(self.local, "level", 0):
+            raise RuntimeError("read lock can't be upgraded to write lock")
+
+        with self.condition:
+            self.waiting_writers += 1
+            try:
+                while self.writer is not None or self.readers:
+                    self.condition.wait()
+            finally:
+                self.waiting_writers -= 1
+
+            self.writer = ident
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = None
+                self.condition.notify_all()
+
+
+class _NullContext:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class NullLock:
+    """
+    lock of the project without concurrent mode, does nothing.
+    (also used as a context manager in place of threading.RLock)
+    """
+    context = _NullContext()
+
+    def read(self):
+        return self.context
+
+    def write(self):
+        return self.context
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
@@ -4,19 +4,27 @@ import sys
 from typing import Iterator
 
 from .config import DEFAULT_ROOT_NODE_ID
+from .traverse import PRE_ORDER, traverse
 
 if False:
     from .project import Project
 
-__all__ = ["Node"]
+__all__ = ["Node", "CLIENT_TIMESTAMP", "EPOCH_TIMESTAMP", "DATETIME_TIMESTAMP"]
+
+# kind of converted timestamp
+CLIENT_TIMESTAMP = "client"  # raw value, seconds since date joined
+EPOCH_TIMESTAMP = "epoch"  # unix time
+DATETIME_TIMESTAMP = "datetime"  # datetime.datetime in local time
 
 
 class Node:
-    __slots__ = ["project", "raw", "__weakref__"]
+    __slots__ = ["project", "raw", "_projectid", "_timestamps", "__weakref__"]
 
     def __init__(self, project, raw):
         self.project = project  # type: Project
         self.raw = raw
+        self._projectid = raw['id']  # kept for hash, after raw is released by delete
+        self._timestamps = None  # key -> (client timestamp, datetime), see Project.cache_timestamps
 
     def __repr__(self):
         return f"<{type(self).__name__}: {self.projectid!r}; {self.last_modified}; ...>"
@@ -41,7 +49,7 @@ class Node:
         """
         parent's node id
         """
-        return self.project.track[self.projectid]
+        return self.project.find_parentid(self.projectid)
 
     @property
     def parent(self):
@@ -74,6 +82,17 @@ class Node:
 
         return self.project.op_create(self, priority=priority, child=node)
 
+    def create_tree(self, spec, priority=-1):
+        """
+        create the nested nodes under this node at once.
+
+        >>> node.create_tree({"name": "a", "children": [{"name": "b", "completed": True}]})
+
+        :param spec: dict (name, description, completed, children) or list of them
+        :return: created node, or list of created nodes if spec is list.
+        """
+        return self.project.op_create_tree(self, spec, priority=priority)
+
     def edit(self, name=None, description=None):
         """
         edit node's name and description.
@@ -106,8 +125,21 @@ class Node:
         """
         return self.project.op_delete(self)
 
+    def move(self, new_parent: "Node", priority=-1):
+        """
+        move the node (with its children) under new_parent.
+        """
+        return self.project.op_move(self, new_parent, priority=priority)
+
     def search(self, pattern):
-        """WIP: not implemented yet."""
+        """
+        search the descendant nodes like workflowy's search box.
+
+        support terms, "quoted phrase", -term, #tag, @person, OR,
+        is:complete and last-changed:<number>[m|h|d|w].
+
+        :rtype: Iterator[Node]
+        """
         return self.project.op_search(self, pattern)
 
     @property
@@ -117,8 +149,7 @@ class Node:
 
         :rtype datetime.datetime
         """
-        lm = self.raw.get('lm')
-        return self.project.get_python_timestamp(lm) if lm else None
+        return self.get_timestamp('lm')
 
     @property
     def name(self):
@@ -149,8 +180,35 @@ class Node:
         """
         completed time
         """
-        cp = self.raw.get('cp')
-        return self.project.get_python_timestamp(cp) if cp else None
+        return self.get_timestamp('cp')
+
+    def get_timestamp(self, key='lm', kind=DATETIME_TIMESTAMP):
+        """
+        converted timestamp of node.
+
+        :param key: 'lm' (last modified) or 'cp' (completed)
+        :param kind: CLIENT_TIMESTAMP, EPOCH_TIMESTAMP or DATETIME_TIMESTAMP
+        :return: None if the node doesn't have the timestamp.
+        """
+        value = self.raw.get(key)
+        if not value:
+            return None
+
+        project = self.project
+        if kind != DATETIME_TIMESTAMP or not project.cache_timestamps:
+            return project.convert_timestamp(value, kind)
+
+        cache = self._timestamps
+        if cache is None:
+            cache = self._timestamps = {}
+
+        cached = cache.get(key)
+        if cached is not None and cached[0] == value:
+            return cached[1]
+
+        result = project.convert_timestamp(value, kind)
+        cache[key] = value, result
+        return result
 
     @property
     def shared(self):
@@ -183,44 +241,62 @@ class Node:
         """
         return list(self)
 
-    def _insert(self, index, node):
-        self.raw.setdefault('ch', []).insert(index, node)
-
-    def walk(self):
+    def walk(self, order=PRE_ORDER, max_depth=None, prune=None) -> Iterator["Node"]:
         """
         walk the node.
+
+        :param order: wfapi.traverse.PRE_ORDER, POST_ORDER or BREADTH_FIRST
+        :param max_depth: don't visit nodes deeper than max_depth (this node is 0)
+        :param prune: callable(node), if it returns true, children of node are skipped.
+        """
+        project = self.project
+
+        raw_prune = None
+        if not project.indexed:
+            def raw_prune(raw):
+                # lazy mode: index children before they are visited.
+                # noinspection PyProtectedMember
+                project._index_children(raw)
+                return prune is not None and prune(project.find_node(raw['id'], raw=raw))
+        elif prune is not None:
+            def raw_prune(raw):
+                return prune(project.find_node(raw['id'], raw=raw))
+
+        for _, raw, _ in project.iter_raw(self.raw, order, max_depth, raw_prune):
+            yield self if raw is self.raw else project.find_node(raw['id'], raw=raw)
+
+    def walk_raw(self, order=PRE_ORDER, max_depth=None, prune=None):
         """
-        yield self
+        walk the node's raw json objects, without creating Node objects.
 
-        for child in self:
-            yield from child.walk()
+        :param prune: callable(raw), if it returns true, children of raw are skipped.
+        """
+        for _, raw, _ in self.project.iter_raw(self.raw, order, max_depth, prune):
+            yield raw
 
-    def pretty_print(self, stream=sys.stdout, indent=0):
+    def pretty_print(self, stream=sys.stdout, indent=0, max_depth=None):
         """
         pretty print the node.
         """
         INDENT_SIZE = 2
 
         def p(*args):
-            print(" " * indent + " ".join(map(str, args)), file=stream)
+            print(" " * (indent + depth * INDENT_SIZE) + " ".join(map(str, args)), file=stream)
 
-        is_empty_root = (
-            self.projectid == DEFAULT_ROOT_NODE_ID and
-            not self.name and indent == 0)
+        for _, raw, depth in traverse(self.raw, max_depth=max_depth):
+            is_empty_root = (
+                raw['id'] == DEFAULT_ROOT_NODE_ID and
+                not raw.get('nm') and indent == 0 and depth == 0)
 
-        if is_empty_root:
-            p("[*]", "Home")
-        else:
-            p("[%s]" % (self.raw.get('cp') and "-" or " ",),
-              self.name,
-              "{%s} " % self.projectid)
-
-        for line in self.raw.get('no', "").splitlines():
-            p(line)
+            if is_empty_root:
+                p("[*]", "Home")
+            else:
+                p("[%s]" % (raw.get('cp') and "-" or " ",),
+                  raw.get('nm'),
+                  "{%s} " % raw['id'])
 
-        indent += INDENT_SIZE
-        for child in self:
-            child.pretty_print(stream=stream, indent=indent)
+            for line in raw.get('no', "").splitlines():
+                p(line)
 
     def to_json(self):
         """
@@ -243,5 +319,40 @@ class Node:
     def __delitem__(self, item):
         self[item].delete()
 
+    @property
+    def subtree_size(self) -> int:
+        """
+        number of nodes in the subtree, including this node.
+        (same as ``sum(1 for _ in node.walk())``, but cached by project)
+        """
+        return self.project.subtree_size(self.projectid)
+
+    def is_ancestor_of(self, node: "Node") -> bool:
+        """
+        check the node is in the subtree of this node. (not including itself)
+        """
+        if node.raw is None or node.project is not self.project:
+            return False
+
+        return self.project.is_ancestor(self.projectid, node.projectid)
+
+    def __contains__(self, item):
+        if not isinstance(item, Node) or item.raw is None:
+            return False
+
+        return self.project.track.get(item.projectid) == self.projectid
+
     def __eq__(self, other):
-        return self.raw == other.raw
+        if self is other:
+            return True
+
+        if not isinstance(other, Node):
+            return NotImplemented
+
+        if self.raw is None or other.raw is None:
+            return False
+
+        return self.project is other.project and self.projectid == other.projectid
+
+    def __hash__(self):
+        return hash(self._projectid)
@@ -2,11 +2,13 @@
 
 import warnings
 
+from .traverse import traverse
+
 if False:
     from .project import Project
 
 __all__ = ["Operation", "EditOperation", "CreateOperation", "CompleteOperation",
-           "UncompleteOperation", "DeleteOperation"]
+           "UncompleteOperation", "DeleteOperation", "MoveOperation", "coalesce_operations"]
 
 OPERATION_REGISTERED = {}
 
@@ -21,6 +23,11 @@ class Operation():
     def __init__(self, project, node):
         self.project = project  # type: project.Project
         self.node = node  # type: node.Node
+        # optimistic mode: applied to project before sent, undo data is kept for rollback.
+        self.applied = False
+        self.undo = None
+        # nothing to apply or send, like delete of the node already removed with its ancestor.
+        self.dropped = False
 
     def __repr__(self):
         return "<Operation: %s; %r>" % (self.operation_name, vars(self))
@@ -48,10 +55,24 @@ class Operation():
         raise NotImplementedError
 
     def get_undo(self):
+        if self.undo is not None:
+            return self.undo
+
         undo_data = self.get_default_undo_data()
         undo_data.update(self.get_undo_data())
         return undo_data
 
+    def apply_local(self):
+        # execute by client before sent (optimistic mode)
+        self.pre_operation()
+        self.undo = self.get_undo()
+        self.post_operation()
+        self.applied = True
+
+    def rollback(self):
+        # revert apply_local by undo data, when server rejected the operation.
+        raise NotImplementedError
+
     def get_operation_data(self):
         raise NotImplementedError
 
@@ -118,13 +139,28 @@ class EditOperation(Operation):
         pass
 
     def post_operation(self):
-        raw = self.node.raw
+        changes = {}
 
         if self.name is not None:
-            raw['nm'] = self.name
+            changes['nm'] = self.name
 
         if self.description is not None:
-            raw['no'] = self.description
+            changes['no'] = self.description
+
+        changes['lm'] = self.project.get_client_timestamp()
+        self.project.update_node(self.node, changes)
+
+    def rollback(self):
+        undo = self.undo
+        changes = dict(lm=undo['previous_last_modified'])
+
+        if self.name is not None:
+            changes['nm'] = undo['previous_name']
+
+        if self.description is not None:
+            changes['no'] = undo['previous_description']
+
+        self.project.update_node(self.node, changes)
 
     @classmethod
     def from_server_operation(cls, project: "Project", data):
@@ -167,10 +203,17 @@ class CreateOperation(Operation):
     def post_operation(self):
         self.project.pending.pop(self.child.projectid, None)
 
-        # noinspection PyProtectedMember
-        self.node._insert(self.priority, self.child.raw)
+        self.project.insert_child(self.node, self.priority, self.child)
         self.project.add_node(node=self.child, parent=self.node, update_quota=True)
 
+    def rollback(self):
+        child = self.child
+        if child.projectid not in self.project.track:
+            return
+
+        self.project.remove_child(self.node, child)
+        self.project.remove_node(node=child, update_quota=True)
+
     def get_operation_data(self):
         return dict(
             parentid=self.node.projectid,
@@ -216,6 +259,13 @@ class _CompleteNodeOperation(Operation):
             previous_completed=self.node.raw.get('cp', False),
         )
 
+    def rollback(self):
+        completed = self.undo['previous_completed']
+        self.project.update_node(self.node, {
+            'cp': None if completed is False else completed,
+            'lm': self.undo['previous_last_modified'],
+        })
+
     @classmethod
     def from_server_operation(cls, project: "Project", data):
         return cls(
@@ -236,8 +286,12 @@ class CompleteOperation(_CompleteNodeOperation):
             self.modified = self.project.get_client_timestamp()
 
     def post_operation(self):
-        raw = self.node.raw
-        raw['cp'] = self.modified
+        # operation from server doesn't have the modified time.
+        now = self.project.get_client_timestamp()
+        self.project.update_node(self.node, {
+            'cp': now if self.modified is None else self.modified,
+            'lm': now,
+        })
 
 
 class UncompleteOperation(_CompleteNodeOperation):
@@ -247,8 +301,10 @@ class UncompleteOperation(_CompleteNodeOperation):
         super().__init__(project, node)
 
     def post_operation(self):
-        raw = self.node.raw
-        raw['cp'] = None
+        self.project.update_node(self.node, {
+            'cp': None,
+            'lm': self.project.get_client_timestamp(),
+        })
 
 
 class DeleteOperation(Operation):
@@ -257,33 +313,300 @@ class DeleteOperation(Operation):
     def __init__(self, project, node):
         super().__init__(project, node)
         self.node = node
-        self.priority = self.node.parent.children.index(node)
+        self.priority = None
+        self.pending_create = None  # type: CreateOperation
+        self.removed_raw = None  # copy of the subtree removed by apply_local
+        self.removed_nodes = {}  # projectid -> cached node of the subtree removed by apply_local
+
+        if node is None:
+            pass
+        elif node.projectid in project.track:
+            self.priority = project.find_priority(node)
+        else:
+            self.pending_create = _find_pending_create(project, node)
 
     def pre_operation(self):
         pass
 
     def post_operation(self):
         node = self.node
-        if self.node.parent:
-            assert node in self.node.parent
-            self.node.parent.raw.get('ch', []).remove(node.raw)
+        if node is None:
+            return
+
+        parent = node.parent
+        if parent is not None:
+            assert node in parent
+            self.project.remove_child(parent, node)
 
         self.project.remove_node(node=node)
 
+    def apply_local(self):
+        if self.node.projectid not in self.project.track:
+            # already removed with the ancestor.
+            self.undo = {}
+            self.applied = True
+            self.dropped = True
+            return
+
+        self.keep_subtree()
+        super().apply_local()
+        self.detach_nodes()
+
+    def keep_subtree(self):
+        # keep the subtree for rollback, before removed.
+        project = self.project
+        raw = self.node.raw
+        # raw json is not changed by remove_node, but ColumnarStore row is released.
+        self.removed_raw = raw if type(raw) is dict else self.node.to_json()
+        self.removed_nodes = {
+            raw['id']: project.cache[raw['id']]
+            for _, raw, _ in traverse(self.removed_raw)
+            if raw['id'] in project.cache
+        }
+
+    def detach_nodes(self):
+        # removed nodes still have id, for the queued operations on them.
+        for projectid, node in self.removed_nodes.items():
+            node.raw = {'id': projectid}
+
+    def rollback(self):
+        if self.removed_raw is None:
+            return
+
+        project = self.project
+        node = self.node
+        node.raw = self.removed_raw
+        parent = project.find_node(self.undo['parentid'])
+        project.insert_child(parent, self.undo['priority'], node)
+        project.add_node(node=node, parent=parent, update_quota=True)
+
+        for projectid, node in self.removed_nodes.items():
+            node.raw = project.find_raw(projectid)
+            project.cache[projectid] = node
+
     def get_operation_data(self):
         return dict(
             projectid=self.node.projectid,
         )
 
     def get_undo_data(self):
+        create = self.pending_create
+        if create is not None:
+            return dict(
+                parentid=create.node.projectid,
+                priority=create.priority,
+            )
+
         return dict(
             parentid=self.node.parent.projectid,
             priority=self.priority,
         )
 
+    @classmethod
+    def from_server_operation(cls, project, data) -> "Operation":
+        projectid = data['projectid']
+        if projectid not in project:
+            # already removed with the ancestor deleted in same transaction.
+            return cls(project=project, node=None)
+
+        return cls(
+            project=project,
+            node=project.find_node(projectid),
+        )
+
+
+class MoveOperation(Operation):
+    operation_name = 'move'
+
+    def __init__(self, project, node, parent, priority):
+        super().__init__(project, node)
+        self.parent = parent
+        self.priority = priority
+        self.pending_create = None  # type: CreateOperation
+
+        if node.projectid not in project.track:
+            self.pending_create = _find_pending_create(project, node)
+
+    def pre_operation(self):
+        if self.priority < 0:
+            count = len(self.parent)
+            if self.node.projectid in self.project.track and \
+                    self.node.parentid == self.parent.projectid:
+                count -= 1
+
+            self.priority = count + self.priority + 1
+
+    def post_operation(self):
+        self.project.move_node(self.node, self.parent, self.priority)
+
+    def rollback(self):
+        parent = self.project.find_node(self.undo['previous_parentid'])
+        self.project.move_node(self.node, parent, self.undo['previous_priority'])
+
+    def get_operation_data(self):
+        return dict(
+            projectid=self.node.projectid,
+            parentid=self.parent.projectid,
+            priority=self.priority,
+        )
+
+    def get_undo_data(self):
+        create = self.pending_create
+        if create is not None:
+            return dict(
+                previous_parentid=create.node.projectid,
+                previous_priority=create.priority,
+            )
+
+        return dict(
+            previous_parentid=self.node.parentid,
+            previous_priority=self.project.find_priority(self.node),
+        )
+
     @classmethod
     def from_server_operation(cls, project, data) -> "Operation":
         return cls(
             project=project,
             node=project.find_node(data['projectid']),
+            parent=project.find_node(data['parentid']),
+            priority=data['priority'],
         )
+
+
+def _find_pending_create(project, node):
+    # create operation of the pending node, queued in same transaction.
+    for op in project.operations:
+        if isinstance(op, CreateOperation) and op.child.projectid == node.projectid:
+            return op
+
+    return None
+
+
+def _get_target(op: Operation):
+    # projectid of the node changed by the operation.
+    if isinstance(op, CreateOperation):
+        return op.child.projectid
+
+    return None if op.node is None else op.node.projectid
+
+
+def coalesce_operations(project: "Project", operations):
+    """
+    merge or cancel the operations before sent to server.
+    (remained operations keep the order)
+
+    - edits of the node are merged into the first one.
+    - complete/uncomplete of the node: only the last one is kept.
+    - create and delete of the pending node are dropped,
+      with the operations on its subtree. (if all of them are applied, or none)
+    - delete of the node under already deleted node is dropped.
+    - move changes the tree, creates and deletes before it are kept.
+
+    undo data are made from the unchanged project at commit,
+    so they are correct for the merged operations.
+    (in optimistic mode, the undo data of the first operation is kept)
+    """
+    result = []  # dropped operation is replaced with None
+    by_target = {}  # projectid -> indexes of operations in result
+    edits = {}  # projectid -> index of EditOperation
+    completes = {}  # projectid -> index of complete/uncomplete
+    created = {}  # pending projectid -> parent projectid
+    created_children = {}  # parent projectid -> pending projectids
+    deleted = set()
+
+    def append(op, target):
+        by_target.setdefault(target, []).append(len(result))
+        result.append(op)
+
+    def is_deleted(projectid):
+        track = project.track
+        while projectid is not None:
+            if projectid in deleted:
+                return True
+
+            projectid = track.get(projectid)
+
+        return False
+
+    def cancel(projectid, delete: DeleteOperation) -> bool:
+        # applied operations are cancelled only with the applied delete, and vice versa.
+        # (then the project is same as none of them is applied)
+        targets = []
+        stack = [projectid]
+        while stack:
+            projectid = stack.pop()
+            targets.append(projectid)
+            stack.extend(created_children.get(projectid, ()))
+
+        for projectid in targets:
+            ops = (result[i] for i in by_target.get(projectid, ()))
+            if any(op is not None and op.applied != delete.applied for op in ops):
+                return False
+
+        for projectid in targets:
+            created_children.pop(projectid, None)
+            created.pop(projectid, None)
+            edits.pop(projectid, None)
+            completes.pop(projectid, None)
+            for i in by_target.pop(projectid, ()):
+                result[i] = None
+
+        return True
+
+    for op in operations:
+        target = _get_target(op)
+        if isinstance(op, EditOperation):
+            i = edits.get(target)
+            if i is None:
+                edits[target] = len(result)
+                append(op, target)
+                continue
+
+            merged = result[i]  # type: EditOperation
+            if merged.applied and op.applied:
+                if merged.name is None:
+                    merged.undo['previous_name'] = op.undo['previous_name']
+
+                if merged.description is None:
+                    merged.undo['previous_description'] = op.undo['previous_description']
+
+            if op.name is not None:
+                merged.name = op.name
+
+            if op.description is not None:
+                merged.description = op.description
+        elif isinstance(op, _CompleteNodeOperation):
+            i = completes.get(target)
+            if i is not None:
+                if op.applied and result[i].applied:
+                    op.undo = result[i].undo
+
+                result[i] = None
+
+            completes[target] = len(result)
+            append(op, target)
+        elif isinstance(op, CreateOperation):
+            parentid = op.node.projectid
+            created[target] = parentid
+            created_children.setdefault(parentid, []).append(target)
+            append(op, target)
+        elif isinstance(op, DeleteOperation):
+            if target in created and cancel(target, op):
+                pass
+            elif op.dropped:
+                pass
+            elif not is_deleted(target):
+                deleted.add(target)
+                append(op, target)
+        elif isinstance(op, MoveOperation):
+            created.clear()
+            created_children.clear()
+            deleted.clear()
+            append(op, target)
+        else:
+            # unknown operation: don't merge over it.
+            edits.clear()
+            completes.clear()
+            append(op, target)
+
+    return [op for op in result if op is not None]
@@ -1,39 +1,116 @@
 import json
+import threading
 import time
 import weakref
+from collections import Counter, deque, namedtuple
+from concurrent.futures import Future
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Type
+from typing import Deque, List, Type
 
+from .arrays import TreeArrays, to_arrays
 from .config import DEFAULT_ROOT_NODE_ID
-from .error import WFRuntimeError, WFNodeNotFoundError
-from .node import Node
+from .error import WFRuntimeError, WFNodeError, WFNodeNotFoundError
+from .index import Index, IntervalIndex
+from .lock import NullLock, RWLock
+from .node import Node, CLIENT_TIMESTAMP, EPOCH_TIMESTAMP, DATETIME_TIMESTAMP
 from .operation import Operation, EditOperation, CreateOperation, CompleteOperation, UncompleteOperation, \
-    DeleteOperation, OPERATION_REGISTERED
+    DeleteOperation, MoveOperation, OPERATION_REGISTERED, coalesce_operations
 from .quota import Quota, VoidQuota, SharedQuota, DefaultQuota
+from .search import Query, parse_query
 from .tools import attrdict, uncapdict, generate_uuid
+from .traverse import PRE_ORDER, POST_ORDER, traverse
 
 if False:
     from .workflowy import Workflowy
 
-__all__ = ["Project"]
+__all__ = ["Project", "ProjectChanges"]
+
+# fields compared by _refresh_project to detect changed nodes
+REFRESH_COMPARE_KEYS = ("nm", "no", "lm", "cp")
+
+ProjectChanges = namedtuple("ProjectChanges", ["added", "removed", "changed"])
 
 
 class Project:
-    def __init__(self, workflowy, ptree):
+    # max number of operations in one transaction, large commit is split.
+    transaction_size = 1000
+
+    def __init__(self, workflowy, ptree, lazy=False, index=None, concurrent=False):
         self.workflowy = workflowy  # type: Workflowy
+        self.lazy = lazy
+        # concurrent mode: tree is guarded by reader/writer lock,
+        # operations and transaction level are kept per thread.
+        self.concurrent = concurrent
+        self.lock = RWLock() if concurrent else NullLock()
+        # lazy index and caches (positions, sizes, nodes) are also filled by readers.
+        self.cache_lock = threading.RLock() if concurrent else NullLock()
+        self.commit_lock = threading.RLock()
+        self.local = threading.local() if concurrent else attrdict()
+        self.indexed = False
         self.status = attrdict()
         self.quota = VoidQuota()  # type: Quota
         self.root = None
         self.cache = weakref.WeakValueDictionary()
         self.track = {}
-        self.operations = []
+        self.raw_index = {}
+        self.positions = {}
+        self.sizes = {}  # projectid -> number of nodes in subtree, computed at first use
+        self.indexes = []  # type: List[Index]
+        self.operations = deque()  # type: Deque[Operation]
         self.pending = {}
         self.transaction_level = 0
+        # merge or cancel the operations at commit. (see coalesce_operations)
+        self.coalesce = True
+        # apply the operations to project when queued, and rollback if server rejected them.
+        self.optimistic = False
+        self.unconfirmed = {}  # id(transaction) -> operations applied by optimistic mode
+        self.last_refresh = None  # type: ProjectChanges
+        # cache converted datetime in Node, invalidated by update_node.
+        self.cache_timestamps = False
+
+        self.init(ptree, index=index)
+
+    @property
+    def operations(self) -> Deque[Operation]:
+        operations = getattr(self.local, "operations", None)
+        if operations is None:
+            operations = self.local.operations = deque()
+
+        return operations
+
+    @operations.setter
+    def operations(self, operations: Deque[Operation]):
+        self.local.operations = operations
+
+    @property
+    def transaction_level(self) -> int:
+        return getattr(self.local, "transaction_level", 0)
+
+    @transaction_level.setter
+    def transaction_level(self, level: int):
+        self.local.transaction_level = level
+
+    def enable_concurrent(self):
+        """
+        switch to concurrent mode, before the other threads use the project.
+        (operations and transaction level of current thread are kept)
+        """
+        if self.concurrent:
+            return
 
-        self.init(ptree)
-
-    def init(self, ptree):
+        local = threading.local()
+        local.__dict__.update(self.local)
+        self.local = local
+        self.lock = RWLock()
+        self.cache_lock = threading.RLock()
+        self.concurrent = True
+
+    def init(self, ptree, index=None):
+        """
+        :param index: (track, raw_index) of root project children,
+                      already built by wfapi.stream.TrackBuilder
+        """
         # TODO: support auxiliaryProjectTreeInfos for embbed node.
         s = self.status
         s.update(uncapdict(ptree))
@@ -51,41 +128,123 @@ class Project:
 
         root_project = s.pop("root_project")
         root_project_children = s.pop("root_project_children")
-        self._update_root(root_project, root_project_children)
+        self._update_root(root_project, root_project_children, index=index)
 
-    def _refresh_project(self, ptree):
-        self.init(ptree)
+        for index in self.indexes:
+            index.rebuild()
 
-        removed = set()
-        for projectid, node in self.cache.items():
-            if projectid in self.track:
-                path = self.find_path(projectid)
-                raw = self.resolve_path(path)
-                node.raw = raw
-            else:
-                # TODO: if node.raw is None, raise error if possible (in Node class)
-                node.raw = None
-                removed.add(projectid)
+    def _refresh_project(self, ptree, index=None) -> ProjectChanges:
+        """
+        reload the project from ptree and rebind the cached nodes.
+
+        :return: projectids of added, removed and changed nodes.
+        """
+        with self.lock.write():
+            # changes can't be computed from partial index.
+            self.index_all()
+
+            old_track, self.track = self.track, {}
+            old_index, self.raw_index = self.raw_index, {}
+            self.positions = {}
+
+            self.init(ptree, index=index)
+            self.index_all()
+
+            track = self.track
+            index = self.raw_index
+
+            added = index.keys() - old_index.keys()
+            removed = old_index.keys() - index.keys()
+            changed = set()
+            for projectid, raw in index.items():
+                old_raw = old_index.get(projectid)
+                if old_raw is None:
+                    continue
 
-        for projectid in removed:
-            self.cache.pop(projectid, None)
+                if track[projectid] != old_track[projectid]:
+                    changed.add(projectid)
+                    continue
+
+                for key in REFRESH_COMPARE_KEYS:
+                    if raw.get(key) != old_raw.get(key):
+                        changed.add(projectid)
+                        break
+
+            for projectid, node in list(self.cache.items()):
+                # TODO: if node.raw is None, raise error if possible (in Node class)
+                node.raw = index.get(projectid)
+                if node.raw is None:
+                    self.cache.pop(projectid, None)
+
+            self.last_refresh = ProjectChanges(added=added, removed=removed, changed=changed)
+            return self.last_refresh
+
+    def _reset_track(self, index=None):
+        self.positions.clear()
+        self.sizes.clear()
+
+        if index is not None:
+            self.track, self.raw_index = index
+            root = self.root.raw
+            self.track[root["id"]] = None
+            self.raw_index[root["id"]] = root
+            self.indexed = True
+            return
 
-    def _reset_track(self):
         self.track.clear()
+        self.raw_index.clear()
+        self.indexed = not self.lazy
+
+        if self.lazy:
+            root = self.root.raw
+            self.track[root["id"]] = None
+            self.raw_index[root["id"]] = root
+            self._index_children(root)
+            return
 
-        for parentid, projectid in self._travalse_child(None, self.root.raw):
+        for parentid, raw, _ in traverse(self.root.raw):
+            projectid = raw["id"]
             self.track[projectid] = parentid
+            self.raw_index[projectid] = raw
 
-    def _travalse_child(self, parentid, raw):
-        projectid = raw["id"]
-        yield parentid, projectid
+    def _index_children(self, raw):
+        # lazy mode: index the children list at first visit.
+        if self.indexed:
+            return
 
         ch = raw.get("ch")
-        if ch is not None:
+        if not ch or ch[0]["id"] in self.track:
+            return
+
+        with self.cache_lock:
+            parentid = raw["id"]
             for child in ch:
-                yield from self._travalse_child(projectid, child)
+                projectid = child["id"]
+                self.track[projectid] = parentid
+                self.raw_index[projectid] = child
+
+    def index_all(self):
+        """
+        index every node of lazy project. (required by search)
+        """
+        if self.indexed:
+            return
+
+        # readers index the project too, the tree isn't changed while reading.
+        with self.lock.read(), self.cache_lock:
+            if self.indexed:
+                return
+
+            track = self.track
+            for parentid, raw, _ in traverse(self.root.raw):
+                projectid = raw["id"]
+                if projectid not in track:
+                    track[projectid] = parentid
+                    self.raw_index[projectid] = raw
+
+            self.indexed = True
 
-    def _update_root(self, root_project, root_project_children):
+    def _update_root(self, root_project, root_project_children, index=None):
         root = {} if root_project is None else root_project
 
         root.update(
@@ -96,7 +255,7 @@ class Project:
         )
 
         self.root = self.new_node(root)
-        self._reset_track()
+        self._reset_track(index)
 
     def new_node(self, raw=None, projectid=None):
         if raw is None:
@@ -107,7 +266,8 @@ class Project:
         node = Node(self, raw)
 
         if node.projectid in self.track:
-            self.cache[node.projectid] = node
+            with self.cache_lock:
+                self.cache[node.projectid] = node
 
         return node
 
@@ -138,45 +298,288 @@ class Project:
     def find_parent(self, node: Node) -> Node:
         return self.find_node(node.parentid)
 
+    def find_parentid(self, projectid):
+        track = self.track
+        if projectid not in track and not self.indexed:
+            # lazy mode: the node from walk_raw() may not be indexed yet.
+            self.index_all()
+
+        return track[projectid]
+
     def find_node(self, projectid, raw=None) -> Node:
         node = self.cache.get(projectid)
         if node is not None:
             return node
 
         if raw is None:
-            path = self.find_path(projectid)
-            raw = self.resolve_path(path)
+            raw = self.find_raw(projectid)
 
         return self.new_node(raw)
 
+    def find_raw(self, projectid):
+        with self.lock.read():
+            raw = self.raw_index.get(projectid)
+            if raw is None and not self.indexed:
+                self.index_all()
+                raw = self.raw_index.get(projectid)
+
+        if raw is None:
+            raise WFNodeNotFoundError(projectid)
+
+        return raw
+
     def find_child(self, node: Node):
-        ch = node.raw.get('ch')
-        if not ch:
-            return
+        with self.lock.read():
+            ch = node.raw.get('ch')
+            if not ch:
+                return
+
+            self._index_children(node.raw)
+            if self.concurrent:
+                ch = list(ch)
 
         for child in ch:
             yield self.find_node(child['id'], raw=child)
 
+    def find_priority(self, node: Node) -> int:
+        parentid = node.parentid
+        with self.lock.read():
+            return self._find_priority(parentid, node.projectid)
+
+    def _find_priority(self, parentid, projectid) -> int:
+        positions = self.positions.get(parentid)
+        if positions is None:
+            ch = self.find_raw(parentid).get('ch', ())
+            positions = {child['id']: priority for priority, child in enumerate(ch)}
+            with self.cache_lock:
+                self.positions[parentid] = positions
+
+        return positions[projectid]
+
+    def subtree_size(self, projectid) -> int:
+        """
+        number of nodes in the subtree, including the node itself.
+        """
+        size = self.sizes.get(projectid)
+        if size is not None:
+            return size
+
+        sizes = self.sizes
+        with self.lock.read(), self.cache_lock:
+            for _, raw, _ in traverse(self.find_raw(projectid), POST_ORDER):
+                ch = raw.get('ch')
+                sizes[raw['id']] = 1 + sum(sizes[child['id']] for child in ch) if ch else 1
+
+            return sizes[projectid]
+
+    def _update_sizes(self, parentid, delta):
+        # cached sizes of the ancestors. (some of them may not be cached yet)
+        sizes = self.sizes
+        if not sizes:
+            return
+
+        track = self.track
+        while parentid is not None:
+            size = sizes.get(parentid)
+            if size is not None:
+                sizes[parentid] = size + delta
+
+            parentid = track[parentid]
+
+    def _discard_sizes(self, parentid):
+        # sizes of the ancestors can't be updated without the size of moved subtree.
+        sizes = self.sizes
+        if not sizes:
+            return
+
+        track = self.track
+        while parentid is not None:
+            sizes.pop(parentid, None)
+            parentid = track[parentid]
+
+    def is_ancestor(self, ancestorid, projectid) -> bool:
+        """
+        check the ancestorid is a proper ancestor of projectid.
+        """
+        intervals = self.find_index(IntervalIndex)
+        if intervals is not None:
+            return intervals.is_ancestor(ancestorid, projectid)
+
+        if not self.indexed:
+            self.index_all()
+
+        with self.lock.read():
+            track = self.track
+            parentid = track[projectid]
+            while parentid is not None:
+                if parentid == ancestorid:
+                    return True
+
+                parentid = track[parentid]
+
+            return False
+
+    def document_key(self, projectid):
+        """
+        sort key of the node in document order. (pre-order)
+        """
+        intervals = self.find_index(IntervalIndex)
+        if intervals is not None:
+            return intervals.document_key(projectid)
+
+        if not self.indexed:
+            self.index_all()
+
+        key = []
+        track = self.track
+        with self.lock.read():
+            parentid = track[projectid]
+            while parentid is not None:
+                key.append(self._find_priority(parentid, projectid))
+                projectid, parentid = parentid, track[parentid]
+
+        key.reverse()
+        return key
+
+    def insert_child(self, parent: Node, priority, child: Node):
+        self._index_children(parent.raw)
+
+        ch = parent.raw.setdefault('ch', [])
+        positions = self.positions.get(parent.projectid)
+        if positions is not None:
+            if priority >= len(ch):
+                positions[child.projectid] = len(ch)
+            else:
+                del self.positions[parent.projectid]
+
+        ch.insert(priority, child.raw)
+
+    def remove_child(self, parent: Node, child: Node):
+        ch = parent.raw['ch']
+        priority = self.find_priority(child)
+        if ch[priority]['id'] != child.projectid:
+            # raw children are modified without insert_child/remove_child
+            del self.positions[parent.projectid]
+            priority = self.find_priority(child)
+
+        del ch[priority]
+
+        positions = self.positions[parent.projectid]
+        if priority == len(ch):
+            del positions[child.projectid]
+        else:
+            del self.positions[parent.projectid]
+
+    def remove_children(self, parent: Node, children: List[Node]):
+        """
+        remove the children from the children list of parent in one pass.
+        """
+        ids = {child.projectid for child in children}
+        ch = parent.raw['ch']
+        ch[:] = [raw for raw in ch if raw['id'] not in ids]
+        self.positions.pop(parent.projectid, None)
+
     def add_node(self, node: Node, parent: Node, update_quota=True):
         cnt = 0
-        for cnt, (parentid, projectid) in enumerate(self._travalse_child(parent.projectid, node.raw), 1):
+        for cnt, (parentid, raw, _) in enumerate(traverse(node.raw, parentid=parent.projectid), 1):
+            projectid = raw["id"]
             self.track[projectid] = parentid
+            self.raw_index[projectid] = raw
+
+            for index in self.indexes:
+                index.add(parentid, raw)
+
+        self.cache[node.projectid] = node
+        self._update_sizes(parent.projectid, cnt)
 
         if update_quota:
             self.quota += cnt
 
     def remove_node(self, node: Node, update_quota=True):
+        parentid = self.track.get(node.projectid)
+
         cnt = 0
-        for cnt, (_, projectid) in enumerate(self._travalse_child(node.projectid, node.raw), 1):
-            del self.track[projectid]
+        for cnt, (_, raw, _) in enumerate(traverse(node.raw), 1):
+            for index in self.indexes:
+                index.remove(raw)
+
+            projectid = raw["id"]
+            # lazy mode: descendants may not indexed yet.
+            self.track.pop(projectid, None)
+            self.raw_index.pop(projectid, None)
+            self.positions.pop(projectid, None)
+            self.sizes.pop(projectid, None)
 
             node = self.cache.pop(projectid, None)
             if node is not None:
                 node.raw = None
 
+        self._update_sizes(parentid, -cnt)
+
         if update_quota:
             self.quota -= cnt
 
+    def move_node(self, node: Node, parent: Node, priority):
+        """
+        move the subtree under parent.
+        only the children lists, track of the node, cached sizes of the ancestors
+        and indexes are updated, the subtree is not walked.
+        """
+        projectid = node.projectid
+        old_parentid = self.track[projectid]
+
+        size = self.sizes.get(projectid)
+        if size is not None:
+            self._update_sizes(old_parentid, -size)
+            self._update_sizes(parent.projectid, size)
+        else:
+            self._discard_sizes(old_parentid)
+            self._discard_sizes(parent.projectid)
+
+        self._move_child(self.find_node(old_parentid), parent, priority, node)
+
+        for index in self.indexes:
+            index.move(node.raw, old_parentid, parent.projectid)
+
+    def _move_child(self, old_parent: Node, parent: Node, priority, child: Node):
+        self.remove_child(old_parent, child)
+        self.insert_child(parent, priority, child)
+        self.track[child.projectid] = parent.projectid
+
+    def update_node(self, node: Node, changes):
+        """
+        update the raw json of node, and indexes.
+        """
+        raw = node.raw
+        old = {key: raw.get(key) for key in changes}
+        raw.update(changes)
+        node._timestamps = None
+
+        for index in self.indexes:
+            index.update(raw, old)
+
+    def add_index(self, index: Index) -> Index:
+        """
+        attach the secondary index (like wfapi.index.FullTextIndex) to project.
+        """
+        self.index_all()
+        with self.lock.write():
+            self.indexes.append(index)
+            index.attach(self)
+
+        return index
+
+    def find_index(self, index_class: Type[Index]):
+        for index in self.indexes:
+            if isinstance(index, index_class):
+                return index
+
+        return None
+
+    def remove_index(self, index: Index):
+        with self.lock.write():
+            self.indexes.remove(index)
+
     def update_by_pushpoll(self, res):
         error = res.get("error")
         if error:
@@ -202,7 +605,7 @@ class Project:
     @contextmanager
     def transaction(self):
         if self.operations is None:
-            self.operations = []
+            self.operations = deque()
 
         self.transaction_level += 1
 
@@ -214,15 +617,73 @@ class Project:
         if not self.transaction_level:
             self.commit()
 
-    def commit(self):
+    def commit(self) -> List[Future]:
+        """
+        send the operations to server.
+        (queued until the end of Workflowy.pipeline, if pipelining)
+
+        :return: futures of the push_and_poll results, one per transaction.
+        """
+        # commits of the threads are serialized.
+        with self.commit_lock:
+            if self.coalesce:
+                with self.lock.read():
+                    operations = coalesce_operations(self, self.operations)
+
+                self.operations.clear()
+                self.operations.extend(operations)
+
+            if self.workflowy.is_deferred():
+                # queued transaction is applied now, the next commits are built on it.
+                return self._push_operations(apply_local=True)
+
+            # every transaction is queued before sent in one request,
+            # so the failed transaction doesn't leave the rest of operations for the next commit.
+            with self.workflowy.pipeline():
+                return self._push_operations(apply_local=False)
+
+    def _push_operations(self, apply_local) -> List[Future]:
+        futures = []
+        while True:
+            with self.lock.write():
+                transaction = self.build_transaction(apply_local=apply_local)
+
+            futures.append(self.workflowy.push_transaction(self, transaction))
+            if not self.operations:
+                return futures
+
+    def build_transaction(self, apply_local=False):
+        """
+        serialize and remove the operations (up to transaction_size) as one transaction.
+
+        :param apply_local: apply the operations to project like optimistic mode,
+                            for the transaction which is not sent now.
+        """
+        queue = self.operations
+        # operations in one transaction share the timestamp.
+        client_timestamp = self.get_client_timestamp()
+
         operations = []
-        for op in self.operations[:]:  # type: Operation
-            op.pre_operation()
+        applied = []
+        for _ in range(min(len(queue), self.transaction_size)):
+            op = queue[0]  # type: Operation
+            if op.applied:
+                applied.append(op)
+            elif apply_local:
+                op.apply_local()
+                if op.dropped:
+                    queue.popleft()
+                    continue
+
+                applied.append(op)
+            else:
+                op.pre_operation()
+
             op_json = op.get_operation()
-            op_json["client_timestamp"] = self.get_client_timestamp()
+            op_json["client_timestamp"] = client_timestamp
             op_json["undo_data"] = op.get_undo()
             operations.append(op_json)
-            self.operations.remove(op)
+            queue.popleft()
 
         transaction = dict(
             most_recent_operation_transaction_id=
@@ -236,50 +697,289 @@ class Project:
                 share_id=self.status.share_id,
             )
 
-        transactions = [transaction]
+        if applied:
+            self.unconfirmed[id(transaction)] = applied
+
+        return transaction
+
+    def apply_result(self, result, transaction=None):
+        """
+        apply the result of the transaction from push_and_poll.
+        operations already applied by optimistic mode are skipped,
+        or rolled back if the server returns error.
+        """
+        error = result.get('error')
+        if error:
+            self.rollback_transaction(transaction)
+            raise WFRuntimeError(error)
+
+        applied = Counter(
+            (op.operation_name, op.get_operation_data().get('projectid'))
+            for op in self.unconfirmed.pop(id(transaction), ())
+        )
 
-        response = self.workflowy._push_and_poll(transactions)
-        for result in response['results']:
-            error = result.get('error')
-            if error:
-                raise WFRuntimeError(error)
+        new_transaction_id = result.get('new_most_recent_operation_transaction_id')
+        if new_transaction_id is not None:
+            self.status.most_recent_operation_transaction_id = new_transaction_id
 
-            server_run_operation_transaction_json = result['server_run_operation_transaction_json']
-            server_run_operation_transaction = json.loads(server_run_operation_transaction_json)
+        server_run_operation_transaction_json = result['server_run_operation_transaction_json']
+        server_run_operation_transaction = json.loads(server_run_operation_transaction_json)
+        with self.lock.write():
+            deletes = []  # nodes of consecutive delete operations
             for op_json in server_run_operation_transaction['ops']:
+                key = (op_json['type'], op_json['data'].get('projectid'))
+                if applied[key]:
+                    applied[key] -= 1
+                    continue
+
                 op_cls: Type[Operation] = OPERATION_REGISTERED[op_json['type']]
                 op = op_cls.from_server_operation(self, op_json['data'])
+                if isinstance(op, DeleteOperation):
+                    if op.node is not None:
+                        deletes.append(op.node)
+
+                    continue
+
+                if deletes:
+                    self._remove_echoed_deletes(deletes)
+                    deletes = []
+
                 op.post_operation()
 
+            if deletes:
+                self._remove_echoed_deletes(deletes)
+
+    def rollback_transaction(self, transaction):
+        """
+        revert the operations of the transaction applied by optimistic mode.
+        """
+        applied = self.unconfirmed.pop(id(transaction), None)
+        if not applied:
+            return
+
+        with self.lock.write():
+            for op in reversed(applied):
+                op.rollback()
+
+    def queue_operation(self, op: Operation):
+        """
+        queue the operation in current transaction, and apply it now in optimistic mode.
+        """
+        if self.optimistic:
+            with self.lock.write():
+                op.apply_local()
+
+            if op.dropped:
+                return
+
+        self.operations.append(op)
+
     def op_edit(self, node, name=None, description=None):
-        with self.transaction() as tr:
-            tr.append(EditOperation(self, node, name=name, description=description))
+        with self.transaction():
+            self.queue_operation(EditOperation(self, node, name=name, description=description))
 
     def op_create(self, node, priority=-1, child=None):
         if child is None:
             child = self.new_node()
 
-        with self.transaction() as tr:
-            tr.append(CreateOperation(self, node, child=child, priority=priority))
+        with self.transaction():
+            self.queue_operation(CreateOperation(self, node, child=child, priority=priority))
 
         return child
 
+    def op_create_tree(self, node, spec, priority=-1):
+        """
+        create the nested nodes from spec. (see Node.create_tree)
+
+        ids are generated first, and the quota is checked for all nodes.
+        in optimistic mode, the subtree is added to project in one pass,
+        and the create/edit/complete operations are queued as already applied.
+        otherwise they are queued and applied by server echo, like Node.create and Node.edit.
+        """
+        specs = [spec] if isinstance(spec, dict) else list(spec)
+        if priority < 0:
+            priority = len(node) + priority + 1
+
+        optimistic = self.optimistic
+        now = self.get_client_timestamp()
+        tops = []
+        created = []
+        operations = []
+        stack = [(node, priority + i, item) for i, item in reversed(list(enumerate(specs)))]
+        while stack:
+            parent, child_priority, item = stack.pop()
+            # same as the node created by server, for the undo data.
+            child = self.new_node({'id': generate_uuid(), 'nm': '', 'lm': now})
+            created.append(child)
+            if parent is node:
+                tops.append(child)
+
+            name = item.get('name')
+            description = item.get('description')
+            ops = [CreateOperation(self, parent, child=child, priority=child_priority)]
+            if name is not None or description is not None:
+                ops.append(EditOperation(self, child, name=name, description=description))
+
+            if item.get('completed'):
+                ops.append(CompleteOperation(self, child, modified=now))
+
+            operations.extend(ops)
+
+            children = item.get('children')
+            if children:
+                stack.extend((child, i, item) for i, item in reversed(list(enumerate(children))))
+
+            if not optimistic:
+                continue
+
+            for op in ops:
+                op.undo = op.get_undo()
+                op.applied = True
+
+            raw = child.raw
+            if name is not None:
+                raw['nm'] = name
+
+            if description is not None:
+                raw['no'] = description
+
+            if item.get('completed'):
+                raw['cp'] = now
+
+            if children:
+                raw['ch'] = []
+
+            if parent is not node:
+                parent.raw['ch'].append(raw)
+
+        self.quota.check(len(created))
+
+        with self.transaction():
+            if optimistic:
+                with self.lock.write():
+                    for i, child in enumerate(tops):
+                        self.insert_child(node, priority + i, child)
+                        self.add_node(node=child, parent=node, update_quota=True)
+
+                    raw_index = self.raw_index
+                    with self.cache_lock:
+                        for child in created:
+                            # raw may be replaced by insert_child. (like ColumnarStore row)
+                            child.raw = raw_index[child.projectid]
+                            self.cache[child.projectid] = child
+
+            self.operations.extend(operations)
+
+        return tops[0] if isinstance(spec, dict) else tops
+
     def op_complete(self, node, modified=None):
-        with self.transaction() as tr:
-            tr.append(CompleteOperation(self, node, modified=modified))
+        with self.transaction():
+            self.queue_operation(CompleteOperation(self, node, modified=modified))
 
     def op_uncomplete(self, node):
-        with self.transaction() as tr:
-            tr.append(UncompleteOperation(self, node))
+        with self.transaction():
+            self.queue_operation(UncompleteOperation(self, node))
+
+    def op_move(self, node, parent, priority=-1):
+        # pending node (created in same transaction) has no subtree to move into.
+        if parent.projectid == node.projectid or (
+                node.projectid in self and parent.projectid in self and
+                self.is_ancestor(node.projectid, parent.projectid)):
+            raise WFNodeError(f"can't move {node.projectid!r} into its subtree")
+
+        with self.transaction():
+            self.queue_operation(MoveOperation(self, node, parent=parent, priority=priority))
 
     def op_delete(self, node):
-        with self.transaction() as tr:
-            tr.append(DeleteOperation(self, node))
+        with self.transaction():
+            self.queue_operation(DeleteOperation(self, node))
+
+    def delete_many(self, nodes):
+        """
+        delete the nodes in one transaction.
+
+        nodes under another deleted node are dropped, and deletes of the siblings are
+        sorted by priority (last first) so the undo priorities are valid.
+        the children list of each parent is changed once: at queue in optimistic mode
+        (the deletes are queued as already applied, like Node.create_tree),
+        otherwise when the server echo of them is applied.
+        """
+        nodes = list(nodes)
+        pending = [node for node in nodes if node.projectid not in self]  # created in same transaction.
+        by_parent = self._group_deletes(node for node in nodes if node.projectid in self)
+
+        with self.transaction():
+            with self.lock.write():
+                for parentid, children in by_parent.items():
+                    operations = sorted(
+                        (DeleteOperation(self, node) for node in children),
+                        key=lambda op: op.priority,
+                        reverse=True,
+                    )
+
+                    if self.optimistic:
+                        self._apply_deletes(self.find_node(parentid), operations)
+
+                    self.operations.extend(operations)
+
+            for node in pending:
+                self.queue_operation(DeleteOperation(self, node))
+
+    def _group_deletes(self, nodes):
+        # parentid -> deleted children, nodes under another deleted node are dropped.
+        nodes = {node.projectid: node for node in nodes}
+        track = self.track
+        by_parent = {}
+        for projectid, node in nodes.items():
+            parentid = ancestorid = track[projectid]
+            while ancestorid is not None and ancestorid not in nodes:
+                ancestorid = track[ancestorid]
+
+            if ancestorid is None:
+                by_parent.setdefault(parentid, []).append(node)
+
+        return by_parent
+
+    def _apply_deletes(self, parent: Node, operations: List[DeleteOperation]):
+        # remove the children of parent in one pass, for the optimistic delete_many.
+        for op in operations:
+            op.undo = op.get_undo()
+            op.keep_subtree()
+            op.applied = True
+
+        self._remove_siblings(parent, [op.node for op in operations])
+        for op in operations:
+            op.detach_nodes()
+
+    def _remove_siblings(self, parent: Node, nodes: List[Node]):
+        self.remove_children(parent, nodes)
+        for node in nodes:
+            self.remove_node(node)
+
+    def _remove_echoed_deletes(self, nodes: List[Node]):
+        # consecutive deletes from the server echo, removed from each children list in one pass.
+        for parentid, children in self._group_deletes(nodes).items():
+            self._remove_siblings(self.find_node(parentid), children)
 
     def op_search(self, node, pattern):
-        # pattern is very complex.
-        # http://blog.workflowy.com/2012/09/25/hidden-search-operators/
-        raise NotImplementedError("search is not implemented yet.")
+        query = pattern if isinstance(pattern, Query) else parse_query(pattern)
+        if not self.concurrent:
+            return query.search(self, node)
+
+        # don't keep the read lock while the caller iterates the result.
+        with self.lock.read():
+            return iter(list(query.search(self, node)))
+
+    def iter_raw(self, raw, order=PRE_ORDER, max_depth=None, prune=None):
+        """
+        traverse the raw json (see wfapi.traverse.traverse)
+        in concurrent mode, the nodes are collected under the read lock first.
+        """
+        if not self.concurrent:
+            return traverse(raw, order, max_depth, prune)
+
+        with self.lock.read():
+            return iter(list(traverse(raw, order, max_depth, prune)))
 
     def get_client_timestamp(self, current_time=None):
         if current_time is None:
@@ -291,6 +991,51 @@ class Project:
         current_timestamp = self.status.date_joined_timestamp_in_seconds + client_timestamp
         return datetime.fromtimestamp(current_timestamp)
 
+    def convert_timestamp(self, client_timestamp, kind=DATETIME_TIMESTAMP):
+        if kind == DATETIME_TIMESTAMP:
+            return self.get_python_timestamp(client_timestamp)
+        elif kind == EPOCH_TIMESTAMP:
+            return self.status.date_joined_timestamp_in_seconds + client_timestamp
+        elif kind == CLIENT_TIMESTAMP:
+            return client_timestamp
+
+        raise ValueError(f"unknown timestamp kind: {kind!r}")
+
+    def get_timestamps(self, nodes, key='lm', kind=DATETIME_TIMESTAMP) -> list:
+        """
+        convert the timestamps of many nodes at once.
+
+        :param nodes: iterable of Node or raw json
+        :param key: 'lm' (last modified) or 'cp' (completed)
+        :param kind: CLIENT_TIMESTAMP, EPOCH_TIMESTAMP or DATETIME_TIMESTAMP
+        :return: list of converted timestamp (None for missing), aligned with nodes.
+        """
+        values = [
+            (node.raw if isinstance(node, Node) else node).get(key) or None
+            for node in nodes
+        ]
+
+        if kind == CLIENT_TIMESTAMP:
+            return values
+
+        offset = self.status.date_joined_timestamp_in_seconds
+        if kind == EPOCH_TIMESTAMP:
+            return [None if value is None else offset + value for value in values]
+        elif kind != DATETIME_TIMESTAMP:
+            raise ValueError(f"unknown timestamp kind: {kind!r}")
+
+        fromtimestamp = datetime.fromtimestamp
+        converted = {None: None}
+        result = []
+        for value in values:
+            dt = converted.get(value, converted)
+            if dt is converted:
+                dt = converted[value] = fromtimestamp(offset + value)
+
+            result.append(dt)
+
+        return result
+
     def find_pending(self, projectid):
         node = self.pending.get(projectid)
         if node is not None:
@@ -298,17 +1043,34 @@ class Project:
 
         return self.new_node(projectid=projectid)
 
-    def walk(self):
-        return self.root.walk()
+    def walk(self, *args, **kwargs):
+        return self.root.walk(*args, **kwargs)
+
+    def walk_raw(self, *args, **kwargs):
+        return self.root.walk_raw(*args, **kwargs)
+
+    def to_arrays(self) -> "TreeArrays":
+        """
+        export the tree as aligned numpy arrays. (requires numpy)
+
+        :rtype: wfapi.arrays.TreeArrays
+        """
+        with self.lock.read():
+            return to_arrays(self)
 
     def __contains__(self, item):
         if isinstance(item, Node):
             item = item.projectid
 
-        return item in self.track
+        with self.lock.read():
+            if item not in self.track and not self.indexed:
+                self.index_all()
+
+            return item in self.track
 
     def __getitem__(self, projectid):
         return self.find_node(projectid)
 
     def __len__(self):
+        self.index_all()
         return len(self.track)
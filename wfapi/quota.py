@@ -23,6 +23,14 @@ class Quota():
     def is_underflow(self):
         return self.used < 0
 
+    def check(self, count):
+        # raise the overflow error before count items are created.
+        self.used += count
+        try:
+            self.handle_modify()
+        finally:
+            self.used -= count
+
     def handle_modify(self):
         if self.is_overflow():
             self.handle_overflow()
@@ -0,0 +1,373 @@
+import re
+import time
+from itertools import chain
+from typing import Iterator, List
+
+from .index import TAG_REGEX, get_tags, get_text
+from .traverse import traverse
+
+if False:
+    from .node import Node
+    from .project import Project
+
+__all__ = ["parse_query", "Query", "Term", "Tag", "Completed", "LastChanged", "Not", "And", "Or"]
+
+# http://blog.workflowy.com/2012/09/25/hidden-search-operators/
+QUERY_TOKEN_REGEX = re.compile(r'-?"[^"]*"?|\S+')
+TIME_UNITS = {
+    "m": 60,
+    "h": 60 * 60,
+    "d": 60 * 60 * 24,
+    "w": 60 * 60 * 24 * 7,
+}
+LAST_CHANGED_REGEX = re.compile(r"(\d+)([mhdw]?)$")
+
+
+class Clause:
+    # path clause is matched by the node or any of its ancestors in search scope.
+    is_path = False
+
+    def match(self, raw, text, state) -> bool:
+        raise NotImplementedError
+
+    def path_clauses(self):
+        if self.is_path:
+            yield self
+
+
+class Term(Clause):
+    """
+    word or "quoted phrase", matched in name or description (case insensitive)
+    """
+    is_path = True
+
+    def __init__(self, text):
+        self.text = text.lower()
+        self.slot = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.text!r})"
+
+    def match_text(self, text, tags):
+        return self.text in text
+
+    def match(self, raw, text, state):
+        return state[self.slot]
+
+
+class Tag(Term):
+    """
+    #tag or @person
+    """
+
+    def match_text(self, text, tags):
+        return self.text in tags
+
+
+class Completed(Clause):
+    """
+    is:complete
+    """
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+    def match(self, raw, text, state):
+        return bool(raw.get('cp'))
+
+
+class LastChanged(Clause):
+    """
+    last-changed:<number>[m|h|d|w] (default unit is day)
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.since = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.seconds!r})"
+
+    def prepare(self, project: "Project", current_time=None):
+        if current_time is None:
+            current_time = time.time()
+
+        self.since = project.get_client_timestamp(current_time - self.seconds)
+
+    def match(self, raw, text, state):
+        lm = raw.get('lm')
+        return lm is not None and lm >= self.since
+
+
+class Not(Clause):
+    def __init__(self, clause: Clause):
+        self.clause = clause
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.clause!r})"
+
+    def match(self, raw, text, state):
+        return not self.clause.match(raw, text, state)
+
+    def path_clauses(self):
+        return self.clause.path_clauses()
+
+
+class And(Clause):
+    def __init__(self, clauses: List[Clause]):
+        self.clauses = clauses
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.clauses!r})"
+
+    def match(self, raw, text, state):
+        return all(clause.match(raw, text, state) for clause in self.clauses)
+
+    def path_clauses(self):
+        for clause in self.clauses:
+            yield from clause.path_clauses()
+
+
+class Or(And):
+    def match(self, raw, text, state):
+        return any(clause.match(raw, text, state) for clause in self.clauses)
+
+
+def parse_clause(token) -> Clause:
+    if token.startswith("-") and len(token) > 1:
+        return Not(parse_clause(token[1:]))
+
+    if token.startswith('"'):
+        return Term(token.strip('"'))
+
+    lower = token.lower()
+    if lower in ("is:complete", "is:completed"):
+        return Completed()
+
+    if lower.startswith("last-changed:"):
+        m = LAST_CHANGED_REGEX.match(lower[len("last-changed:"):])
+        if m is not None:
+            number, unit = m.groups()
+            return LastChanged(int(number) * TIME_UNITS[unit or "d"])
+
+    if TAG_REGEX.fullmatch(token):
+        return Tag(token)
+
+    return Term(token)
+
+
+def parse_query(pattern) -> "Query":
+    """
+    parse the search pattern like workflowy's search box.
+
+    clauses are joined by AND, and OR joins the two adjacent clauses.
+    (``a b OR c -d`` is ``a AND (b OR c) AND NOT d``)
+    """
+    clauses = []
+    pending_or = False
+    for token in QUERY_TOKEN_REGEX.findall(pattern):
+        if token == "OR" and clauses:
+            pending_or = True
+            continue
+
+        clause = parse_clause(token)
+        if pending_or:
+            last = clauses[-1]
+            if isinstance(last, Or):
+                last.clauses.append(clause)
+            else:
+                clauses[-1] = Or([last, clause])
+            pending_or = False
+        else:
+            clauses.append(clause)
+
+    return Query(And(clauses))
+
+
+class Query:
+    """
+    parsed search query plan.
+
+    path clauses (terms and tags) are resolved by the node or its ancestors,
+    below the search scope node, like the web client.
+    other clauses (is:complete, last-changed:) are resolved by the node only.
+    """
+
+    def __init__(self, root: And):
+        self.root = root
+        self.path_clauses = []  # type: List[Term]
+        for clause in root.path_clauses():
+            clause.slot = len(self.path_clauses)
+            self.path_clauses.append(clause)
+
+        self.use_tags = any(isinstance(clause, Tag) for clause in self.path_clauses)
+
+        # top level negative path clause exclude whole subtree.
+        self.prune_slots = [
+            clause.clause.slot for clause in root.clauses
+            if isinstance(clause, Not) and clause.clause.is_path
+        ]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.root!r})"
+
+    def prepare(self, project: "Project", current_time=None):
+        for clause in self._iter_clauses(self.root):
+            if isinstance(clause, LastChanged):
+                clause.prepare(project, current_time)
+
+    def _iter_clauses(self, clause):
+        yield clause
+        if isinstance(clause, And):
+            for child in clause.clauses:
+                yield from self._iter_clauses(child)
+        elif isinstance(clause, Not):
+            yield from self._iter_clauses(clause.clause)
+
+    def _get_state(self, parent_state, raw):
+        text = get_text(raw)
+        tags = get_tags(text) if self.use_tags else None
+        state = tuple(
+            inherited or clause.match_text(text, tags)
+            for inherited, clause in zip(parent_state, self.path_clauses)
+        )
+        return text, state
+
+    def _is_pruned(self, state):
+        return any(state[slot] for slot in self.prune_slots)
+
+    def match_raw(self, scope_raw) -> Iterator[dict]:
+        """
+        yield raw json objects under scope_raw that match the query, in document order.
+        """
+        return self._match_subtree(scope_raw, (False,) * len(self.path_clauses), skip_top=True)
+
+    def _match_subtree(self, top_raw, parent_state, skip_top=False):
+        root = self.root
+
+        # states[depth] is the state of parent node.
+        states = [parent_state]
+        pruned = None
+
+        def prune(raw):
+            return raw is pruned
+
+        it = traverse(top_raw, prune=prune)
+        if skip_top:
+            # scope node is not a part of search path.
+            next(it)
+            states.append(parent_state)
+
+        for _, raw, depth in it:
+            text, state = self._get_state(states[depth], raw)
+            if self._is_pruned(state):
+                pruned = raw
+                continue
+
+            del states[depth + 1:]
+            states.append(state)
+
+            if root.match(raw, text, state):
+                yield raw
+
+    def _find_candidates(self, project: "Project"):
+        # projectids from the most selective top level clause by indexes.
+        # path clause: every matched node has the ids in itself or its ancestors.
+        # other clause: every matched node is in the ids.
+        best = None
+        best_is_path = False
+        for clause in self.root.clauses:
+            if isinstance(clause, (Not, And)):
+                continue
+
+            for index in project.indexes:
+                ids = index.search_candidates(clause)
+                if ids is not None and (best is None or len(ids) < len(best)):
+                    best = ids
+                    best_is_path = clause.is_path
+
+        return best, best_is_path
+
+    def _get_path(self, project: "Project", scope: "Node", projectid, stop=()):
+        # ancestors between scope and the node, None if out of scope.
+        track = project.track
+        scopeid = scope.projectid
+        path = []
+        parentid = track[projectid]
+        while parentid != scopeid:
+            if parentid is None or parentid in stop:
+                return None
+
+            path.append(parentid)
+            parentid = track[parentid]
+
+        return path
+
+    def _get_path_state(self, project: "Project", path):
+        # state of the last ancestor in path, None if pruned.
+        raw_index = project.raw_index
+        state = (False,) * len(self.path_clauses)
+        for ancestorid in reversed(path):
+            _, state = self._get_state(state, raw_index[ancestorid])
+            if self._is_pruned(state):
+                return None
+
+        return state
+
+    def _find_starts(self, project: "Project", scope: "Node", ids):
+        # top-most candidates in scope with inherited state, in document order.
+        starts = []
+        for projectid in ids:
+            # skip if covered by the ancestor.
+            path = self._get_path(project, scope, projectid, stop=ids)
+            if path is not None:
+                starts.append((projectid, path))
+
+        starts.sort(key=lambda item: project.document_key(item[0]))
+
+        raw_index = project.raw_index
+        for projectid, path in starts:
+            state = self._get_path_state(project, path)
+            if state is not None:
+                yield raw_index[projectid], state
+
+    def _match_nodes(self, project: "Project", scope: "Node", ids):
+        # match each candidate node by itself, in document order.
+        found = [
+            projectid for projectid in ids
+            if projectid != scope.projectid and projectid in project.track
+        ]
+        found.sort(key=project.document_key)
+
+        root = self.root
+        raw_index = project.raw_index
+        for projectid in found:
+            path = self._get_path(project, scope, projectid)
+            if path is None:
+                continue
+
+            parent_state = self._get_path_state(project, path)
+            if parent_state is None:
+                continue
+
+            raw = raw_index[projectid]
+            text, state = self._get_state(parent_state, raw)
+            if not self._is_pruned(state) and root.match(raw, text, state):
+                yield raw
+
+    def search(self, project: "Project", node: "Node") -> Iterator["Node"]:
+        project.index_all()
+        self.prepare(project)
+
+        ids, is_path = self._find_candidates(project)
+        if ids is None:
+            raws = self.match_raw(node.raw)
+        elif is_path:
+            raws = chain.from_iterable(
+                self._match_subtree(raw, state)
+                for raw, state in self._find_starts(project, node, ids))
+        else:
+            raws = self._match_nodes(project, node, ids)
+
+        for raw in raws:
+            yield project.find_node(raw['id'], raw=raw)
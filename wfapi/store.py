@@ -0,0 +1,522 @@
+from array import array
+from collections.abc import MutableMapping, MutableSequence, Mapping
+from typing import List
+
+from .config import DEFAULT_ROOT_NODE_ID
+from .error import WFNodeError
+from .node import Node
+from .project import Project
+from .traverse import traverse
+
+__all__ = ["ColumnarStore", "ColumnarProject", "Row"]
+
+NO_ROW = -1
+NAN = float('nan')
+
+# keys stored in own column, other keys are stored in ColumnarStore.extra
+COLUMN_KEYS = ("id", "nm", "no", "lm", "cp", "ch")
+
+
+class ColumnarStore:
+    """
+    tree of raw json objects, kept in columns instead of dict per node.
+
+    - row links: parent, first_child/last_child/next_sibling, child_count
+    - ids: interned projectid table (row -> projectid, projectid -> row)
+    - lm, cp: client timestamps in array('d'), NaN for missing value.
+    - nm, no: string tables, None for missing value.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.rows = {}
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.last_child = array('i')
+        self.next_sibling = array('i')
+        self.child_count = array('i')
+        self.lm = array('d')
+        self.cp = array('d')
+        self.nm = []
+        self.no = []
+        self.extra = {}
+        self.free = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, projectid):
+        return projectid in self.rows
+
+    def alloc(self, projectid):
+        if projectid in self.rows:
+            raise WFNodeError(f"node {projectid!r} is already in store")
+
+        if self.free:
+            row = self.free.pop()
+            self.ids[row] = projectid
+            self.parent[row] = self.first_child[row] = self.last_child[row] = \
+                self.next_sibling[row] = NO_ROW
+            self.child_count[row] = 0
+            self.lm[row] = self.cp[row] = NAN
+        else:
+            row = len(self.ids)
+            self.ids.append(projectid)
+            for column in (self.parent, self.first_child, self.last_child, self.next_sibling):
+                column.append(NO_ROW)
+            self.child_count.append(0)
+            self.lm.append(NAN)
+            self.cp.append(NAN)
+            self.nm.append(None)
+            self.no.append(None)
+
+        self.rows[projectid] = row
+        return row
+
+    def load(self, raw):
+        """
+        copy the raw json subtree into the store.
+
+        :return: row of raw, not linked to any parent.
+        """
+        top = NO_ROW
+        rows = self.rows
+        for parentid, child, depth in traverse(raw):
+            row = self.alloc(child['id'])
+            for key, value in child.items():
+                if key != 'id' and key != 'ch':
+                    self.set(row, key, value)
+
+            if depth:
+                self.link(rows[parentid], None, row)
+            else:
+                top = row
+
+        return top
+
+    def release(self, row):
+        """
+        free the rows of unlinked subtree.
+        """
+        stack = [row]
+        while stack:
+            row = stack.pop()
+            stack.extend(self.iter_children(row))
+
+            del self.rows[self.ids[row]]
+            self.ids[row] = self.nm[row] = self.no[row] = None
+            self.extra.pop(row, None)
+            self.free.append(row)
+
+    def iter_post_order(self, row):
+        """
+        rows of the subtree, children before parent.
+        """
+        stack = [(row, False)]
+        while stack:
+            row, leave = stack.pop()
+            if leave:
+                yield row
+                continue
+
+            stack.append((row, True))
+            stack.extend((child, False) for child in self.iter_children(row))
+
+    def iter_children(self, row):
+        child = self.first_child[row]
+        next_sibling = self.next_sibling
+        while child != NO_ROW:
+            yield child
+            child = next_sibling[child]
+
+    def nth_child(self, row, priority):
+        count = self.child_count[row]
+        if priority < 0:
+            priority += count
+
+        if not 0 <= priority < count:
+            raise IndexError(priority)
+
+        if priority == count - 1:
+            return self.last_child[row]
+
+        child = self.first_child[row]
+        for _ in range(priority):
+            child = self.next_sibling[child]
+
+        return child
+
+    def link(self, parent, priority, row):
+        """
+        insert unlinked row into children of parent, at end if priority is None.
+        """
+        count = self.child_count[parent]
+        if priority is None or priority >= count:
+            prev = self.last_child[parent]
+        elif priority <= 0:
+            prev = NO_ROW
+        else:
+            prev = self.nth_child(parent, priority - 1)
+
+        if prev == NO_ROW:
+            self.next_sibling[row] = self.first_child[parent]
+            self.first_child[parent] = row
+        else:
+            self.next_sibling[row] = self.next_sibling[prev]
+            self.next_sibling[prev] = row
+
+        if self.next_sibling[row] == NO_ROW:
+            self.last_child[parent] = row
+
+        self.parent[row] = parent
+        self.child_count[parent] = count + 1
+
+    def unlink(self, row):
+        parent = self.parent[row]
+        prev = NO_ROW
+        for child in self.iter_children(parent):
+            if child == row:
+                break
+            prev = child
+        else:
+            raise WFNodeError(f"broken link for {self.ids[row]!r}")
+
+        if prev == NO_ROW:
+            self.first_child[parent] = self.next_sibling[row]
+        else:
+            self.next_sibling[prev] = self.next_sibling[row]
+
+        if self.last_child[parent] == row:
+            self.last_child[parent] = prev
+
+        self.child_count[parent] -= 1
+        self.parent[row] = self.next_sibling[row] = NO_ROW
+
+    def get(self, row, key, default=None):
+        if key == 'id':
+            return self.ids[row]
+        elif key == 'nm' or key == 'no':
+            value = getattr(self, key)[row]
+        elif key == 'lm' or key == 'cp':
+            value = getattr(self, key)[row]
+            if value != value:
+                value = None
+        elif key == 'ch':
+            value = Children(self, row) if self.child_count[row] else None
+        else:
+            value = self.extra.get(row, {}).get(key)
+
+        return default if value is None else value
+
+    def set(self, row, key, value):
+        if key == 'id':
+            raise WFNodeError("projectid can't be changed")
+        elif key == 'nm' or key == 'no':
+            getattr(self, key)[row] = value
+        elif key == 'lm' or key == 'cp':
+            getattr(self, key)[row] = NAN if value is None else value
+        elif key == 'ch':
+            for child in list(self.iter_children(row)):
+                self.unlink(child)
+                self.release(child)
+
+            for child in value or ():
+                self.link(row, None, child.row if isinstance(child, Row) else self.load(child))
+        elif value is None:
+            self.extra.get(row, {}).pop(key, None)
+        else:
+            self.extra.setdefault(row, {})[key] = value
+
+    def keys(self, row):
+        yield 'id'
+        for key in COLUMN_KEYS[1:]:
+            if self.get(row, key) is not None:
+                yield key
+
+        yield from self.extra.get(row, ())
+
+    def to_json(self, row):
+        """
+        build the raw json object (dict) of the subtree.
+        """
+        result = {}
+        stack = [(row, result)]
+        while stack:
+            row, raw = stack.pop()
+            for key in self.keys(row):
+                if key != 'ch':
+                    raw[key] = self.get(row, key)
+
+            if self.child_count[row]:
+                ch = raw['ch'] = []
+                for child in self.iter_children(row):
+                    child_raw = {}
+                    ch.append(child_raw)
+                    stack.append((child, child_raw))
+
+        return result
+
+
+class Row(MutableMapping):
+    """
+    dict like view of one row in ColumnarStore, used as Node.raw
+    """
+    __slots__ = ["store", "row"]
+
+    def __init__(self, store: ColumnarStore, row):
+        self.store = store
+        self.row = row
+
+    def __repr__(self):
+        return f"<{type(self).__name__}: {self.store.ids[self.row]!r}>"
+
+    def __getitem__(self, key):
+        value = self.store.get(self.row, key)
+        if value is None:
+            raise KeyError(key)
+
+        return value
+
+    def get(self, key, default=None):
+        return self.store.get(self.row, key, default)
+
+    def __setitem__(self, key, value):
+        self.store.set(self.row, key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+
+        self.store.set(self.row, key, None)
+
+    def setdefault(self, key, default=None):
+        if key == 'ch':
+            return Children(self.store, self.row)
+
+        return super().setdefault(key, default)
+
+    def __iter__(self):
+        return self.store.keys(self.row)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return self.store is other.store and self.row == other.row
+
+        return isinstance(other, Mapping) and self.store.to_json(self.row) == other
+
+    def __hash__(self):
+        return hash(self.row)
+
+    def __deepcopy__(self, memo):
+        return self.store.to_json(self.row)
+
+
+class Children(MutableSequence):
+    """
+    list like view of children rows.
+    """
+    __slots__ = ["store", "row"]
+
+    def __init__(self, store: ColumnarStore, row):
+        self.store = store
+        self.row = row
+
+    def __len__(self):
+        return self.store.child_count[self.row]
+
+    def __iter__(self):
+        store = self.store
+        for child in store.iter_children(self.row):
+            yield Row(store, child)
+
+    def __getitem__(self, priority):
+        if isinstance(priority, slice):
+            return list(self)[priority]
+
+        return Row(self.store, self.store.nth_child(self.row, priority))
+
+    def __setitem__(self, priority, raw):
+        del self[priority]
+        self.insert(priority, raw)
+
+    def __delitem__(self, priority):
+        self.store.unlink(self.store.nth_child(self.row, priority))
+
+    def insert(self, priority, raw):
+        store = self.store
+        if isinstance(raw, Row):
+            assert raw.store is store
+            row = raw.row
+        else:
+            row = store.load(raw)
+
+        if priority < 0:
+            priority = max(0, len(self) + priority)
+
+        store.link(self.row, priority, row)
+
+
+class ColumnarProject(Project):
+    """
+    Project that keeps the tree in ColumnarStore.
+
+    Project.track and Project.raw_index are read-only views over the store,
+    and Node.raw is Row view.
+
+    >>> Workflowy(..., project_class=ColumnarProject)
+    """
+
+    def __init__(self, workflowy, ptree, lazy=False, index=None, concurrent=False):
+        self.store = None  # type: ColumnarStore
+        # store is always fully indexed, lazy mode and prebuilt index are not used.
+        super().__init__(workflowy, ptree, lazy=False, concurrent=concurrent)
+
+    def _update_root(self, root_project, root_project_children, index=None):
+        root = {} if root_project is None else root_project
+        root.update(
+            id=DEFAULT_ROOT_NODE_ID,
+            ch=root_project_children,
+        )
+
+        store = self.store = ColumnarStore()
+        row = store.load(root)
+        self.track = TrackView(store)
+        self.raw_index = RowIndex(store)
+
+        self.root = self.new_node(Row(store, row))
+        self._reset_track()
+
+    def _reset_track(self, index=None):
+        self.positions.clear()
+        self.sizes.clear()
+        self.indexed = True
+
+    def insert_child(self, parent: Node, priority, child: Node):
+        if not isinstance(child.raw, Row):
+            child.raw = Row(self.store, self.store.load(child.raw))
+
+        super().insert_child(parent, priority, child)
+
+    def remove_child(self, parent: Node, child: Node):
+        # parent is unknown after the row is unlinked.
+        self._update_sizes(parent.projectid, -self.subtree_size(child.projectid))
+        super().remove_child(parent, child)
+
+    def remove_children(self, parent: Node, children: List[Node]):
+        # rows are unlinked one by one.
+        for child in children:
+            self.remove_child(parent, child)
+
+    def _move_child(self, old_parent: Node, parent: Node, priority, child: Node):
+        # sizes are updated by move_node, and track is the parent row changed by link.
+        super().remove_child(old_parent, child)
+        self.insert_child(parent, priority, child)
+
+    def add_node(self, node: Node, parent: Node, update_quota=True):
+        self.cache[node.projectid] = node
+
+        if self.indexes:
+            for parentid, raw, _ in traverse(node.raw, parentid=parent.projectid):
+                for index in self.indexes:
+                    index.add(parentid, raw)
+
+        # the subtree is already in the store, count by links.
+        cnt = self.subtree_size(node.projectid)
+        self._update_sizes(parent.projectid, cnt)
+
+        if update_quota:
+            self.quota += cnt
+
+    def subtree_size(self, projectid) -> int:
+        size = self.sizes.get(projectid)
+        if size is not None:
+            return size
+
+        store = self.store
+        sizes = self.sizes
+        with self.lock.read(), self.cache_lock:
+            for row in store.iter_post_order(store.rows[projectid]):
+                size = 1
+                for child in store.iter_children(row):
+                    size += sizes[store.ids[child]]
+
+                sizes[store.ids[row]] = size
+
+            return sizes[projectid]
+
+    def remove_node(self, node: Node, update_quota=True):
+        store = self.store
+        row = node.raw.row
+
+        cnt = self.subtree_size(node.projectid)
+        if store.parent[row] != NO_ROW:
+            self._update_sizes(self.track[node.projectid], -cnt)
+
+        for _, raw, _ in traverse(node.raw):
+            for index in self.indexes:
+                index.remove(raw)
+
+            projectid = raw['id']
+            self.positions.pop(projectid, None)
+            self.sizes.pop(projectid, None)
+
+            node = self.cache.pop(projectid, None)
+            if node is not None:
+                node.raw = None
+
+        if store.parent[row] != NO_ROW:
+            store.unlink(row)
+
+        store.release(row)
+
+        if update_quota:
+            self.quota -= cnt
+
+
+class TrackView(Mapping):
+    """
+    projectid -> parent's projectid, read from ColumnarStore.
+    """
+    __slots__ = ["store"]
+
+    def __init__(self, store: ColumnarStore):
+        self.store = store
+
+    def __getitem__(self, projectid):
+        store = self.store
+        parent = store.parent[store.rows[projectid]]
+        return None if parent == NO_ROW else store.ids[parent]
+
+    def __contains__(self, projectid):
+        return projectid in self.store.rows
+
+    def __iter__(self):
+        return iter(self.store.rows)
+
+    def __len__(self):
+        return len(self.store.rows)
+
+
+class RowIndex(Mapping):
+    """
+    projectid -> Row, read from ColumnarStore.
+    """
+    __slots__ = ["store"]
+
+    def __init__(self, store: ColumnarStore):
+        self.store = store
+
+    def __getitem__(self, projectid):
+        return Row(self.store, self.store.rows[projectid])
+
+    def __contains__(self, projectid):
+        return projectid in self.store.rows
+
+    def __iter__(self):
+        return iter(self.store.rows)
+
+    def __len__(self):
+        return len(self.store.rows)
@@ -0,0 +1,229 @@
+import codecs
+import json
+
+from .config import DEFAULT_ROOT_NODE_ID
+from .traverse import POST_ORDER, traverse
+
+__all__ = ["StreamDecoder", "TrackBuilder", "ROOT_PROJECT_CHILDREN_PATH"]
+
+ROOT_PROJECT_CHILDREN_PATH = ("projectTreeData", "mainProjectTreeInfo", "rootProjectChildren")
+
+WHITESPACE = " \t\n\r"
+NUMBER_TAIL = ".eE+-"
+
+
+class StreamDecoder:
+    """
+    decode json document from chunks (bytes or str), while chunks arrive.
+
+    the tree (list of raw json nodes) at tree_path is parsed node by node,
+    and on_node(raw) is called when each node (with its children) is completed.
+    other values are decoded by json.JSONDecoder.
+    """
+
+    def __init__(self, chunks, tree_path=ROOT_PROJECT_CHILDREN_PATH, on_node=None):
+        self.chunks = iter(chunks)
+        self.tree_path = tuple(tree_path)
+        self.on_node = on_node
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def decode(self):
+        value = self._parse(self.tree_path)
+        self._skip_whitespace()
+        if self.pos < len(self.buf):
+            raise json.JSONDecodeError("Extra data", self.buf, self.pos)
+
+        return value
+
+    def _fill(self, size=1):
+        # read until size characters are available after pos.
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        parts = [self.buf]
+        length = len(self.buf)
+        while length < size and not self.eof:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                chunk = self.text_decoder.decode(b"", final=True)
+            elif isinstance(chunk, bytes):
+                chunk = self.text_decoder.decode(chunk)
+
+            parts.append(chunk)
+            length += len(chunk)
+
+        self.buf = "".join(parts)
+        return length >= size
+
+    def _peek(self):
+        if self.pos >= len(self.buf) and not self._fill():
+            raise json.JSONDecodeError("Unexpected end of data", self.buf, self.pos)
+
+        return self.buf[self.pos]
+
+    def _skip_whitespace(self):
+        while True:
+            buf = self.buf
+            pos = self.pos
+            while pos < len(buf) and buf[pos] in WHITESPACE:
+                pos += 1
+
+            self.pos = pos
+            if pos < len(buf) or not self._fill():
+                return
+
+    def _expect(self, char):
+        self._skip_whitespace()
+        if self._peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self.buf, self.pos)
+
+        self.pos += 1
+
+    def _next_is(self, char):
+        self._skip_whitespace()
+        if self._peek() == char:
+            self.pos += 1
+            return True
+
+        return False
+
+    def _value(self):
+        self._skip_whitespace()
+        size = 4096
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+                end = None
+
+            if end is not None and (self.eof or not self._is_cut_number(value, end)):
+                self.pos = end
+                return value
+
+            self._fill(len(self.buf) - self.pos + size)
+            size *= 2
+
+    def _is_cut_number(self, value, end):
+        # number at end of buffer may be continued by next chunk. (like "12" + "3.5e+1")
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+
+        tail = self.buf[end:]
+        return len(tail) <= 2 and all(c in NUMBER_TAIL for c in tail)
+
+    def _parse(self, path):
+        if not path:
+            return self._parse_tree()
+
+        self._expect("{")
+        result = {}
+        if self._next_is("}"):
+            return result
+
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == path[0]:
+                result[key] = self._parse(path[1:])
+            else:
+                result[key] = self._value()
+
+            if self._next_is("}"):
+                return result
+
+            self._expect(",")
+
+    def _parse_tree(self):
+        on_node = self.on_node
+        self._expect("[")
+        items = []
+
+        # frame: [is_list, list or raw, is_first]
+        stack = [[True, items, True]]
+        while stack:
+            frame = stack[-1]
+            is_list, container, first = frame
+
+            if is_list:
+                if self._next_is("]"):
+                    stack.pop()
+                    continue
+
+                if not first:
+                    self._expect(",")
+
+                frame[2] = False
+                self._skip_whitespace()
+
+                # fast path: whole node is already in buffer.
+                try:
+                    raw, end = self.decoder.raw_decode(self.buf, self.pos)
+                except json.JSONDecodeError:
+                    pass
+                else:
+                    self.pos = end
+                    container.append(raw)
+                    if on_node is not None:
+                        for _, child, _ in traverse(raw, POST_ORDER):
+                            on_node(child)
+                    continue
+
+                self._expect("{")
+                raw = {}
+                container.append(raw)
+                stack.append([False, raw, True])
+            else:
+                if self._next_is("}"):
+                    stack.pop()
+                    if on_node is not None:
+                        on_node(container)
+                    continue
+
+                if not first:
+                    self._expect(",")
+
+                frame[2] = False
+                key = self._value()
+                self._expect(":")
+                if key == "ch" and self._next_is("["):
+                    ch = container["ch"] = []
+                    stack.append([True, ch, True])
+                else:
+                    container[key] = self._value()
+
+        return items
+
+
+class TrackBuilder:
+    """
+    build Project.track and Project.raw_index from StreamDecoder.on_node
+    """
+
+    def __init__(self):
+        self.track = {}
+        self.raw_index = {}
+
+    def __call__(self, raw):
+        projectid = raw["id"]
+        self.raw_index[projectid] = raw
+
+        ch = raw.get("ch")
+        if ch:
+            track = self.track
+            for child in ch:
+                track[child["id"]] = projectid
+
+    def finish(self, root_project_children):
+        for child in root_project_children:
+            self.track[child["id"]] = DEFAULT_ROOT_NODE_ID
+
+        return self.track, self.raw_index
@@ -0,0 +1,91 @@
+from collections import deque
+
+__all__ = ["PRE_ORDER", "POST_ORDER", "BREADTH_FIRST", "traverse"]
+
+PRE_ORDER = "pre"
+POST_ORDER = "post"
+BREADTH_FIRST = "breadth"
+
+
+def traverse(raw, order=PRE_ORDER, max_depth=None, prune=None, parentid=None):
+    """
+    walk the raw json tree without recursion.
+
+    yield (parentid, raw, depth) for each raw node, the start raw has depth 0.
+
+    :param order: PRE_ORDER, POST_ORDER or BREADTH_FIRST
+    :param max_depth: don't visit nodes deeper than max_depth
+    :param prune: callable(raw), if it returns true, children of raw are skipped.
+    """
+    if order == PRE_ORDER:
+        return _pre_order(raw, parentid, max_depth, prune)
+    elif order == POST_ORDER:
+        return _post_order(raw, parentid, max_depth, prune)
+    elif order == BREADTH_FIRST:
+        return _breadth_first(raw, parentid, max_depth, prune)
+
+    raise ValueError(f"unknown traverse order: {order!r}")
+
+
+def _get_children(raw, depth, max_depth, prune):
+    if max_depth is not None and depth >= max_depth:
+        return None
+
+    ch = raw.get("ch")
+    if not ch:
+        return None
+
+    if prune is not None and prune(raw):
+        return None
+
+    return ch
+
+
+def _pre_order(raw, parentid, max_depth, prune):
+    yield parentid, raw, 0
+
+    ch = _get_children(raw, 0, max_depth, prune)
+    if ch is None:
+        return
+
+    stack = [(raw["id"], iter(ch), 1)]
+    while stack:
+        parentid, children, depth = stack[-1]
+        for child in children:
+            yield parentid, child, depth
+
+            ch = _get_children(child, depth, max_depth, prune)
+            if ch is not None:
+                stack.append((child["id"], iter(ch), depth + 1))
+                break
+        else:
+            stack.pop()
+
+
+def _post_order(raw, parentid, max_depth, prune):
+    ch = _get_children(raw, 0, max_depth, prune)
+    stack = [(parentid, raw, 0, iter(() if ch is None else ch))]
+    while stack:
+        parentid, raw, depth, children = stack[-1]
+        for child in children:
+            ch = _get_children(child, depth + 1, max_depth, prune)
+            if ch is None:
+                yield raw["id"], child, depth + 1
+            else:
+                stack.append((raw["id"], child, depth + 1, iter(ch)))
+                break
+        else:
+            stack.pop()
+            yield parentid, raw, depth
+
+
+def _breadth_first(raw, parentid, max_depth, prune):
+    queue = deque([(parentid, raw, 0)])
+    while queue:
+        parentid, raw, depth = item = queue.popleft()
+        yield item
+
+        ch = _get_children(raw, depth, max_depth, prune)
+        if ch is not None:
+            projectid = raw["id"]
+            queue.extend((projectid, child, depth + 1) for child in ch)
@@ -1,36 +1,57 @@
 import json
 import sys
+import threading
+from concurrent.futures import Future
 from contextlib import contextmanager
-from typing import List
+from typing import List, Tuple, Type
 
 from .browser import DefaultBrowser, Browser
 from .config import DEFAULT_WORKFLOWY_CLIENT_VERSION
-from .error import WFLoginError
+from .error import WFLoginError, WFRuntimeError
 from .node import Node
 from .parse import get_globals_from_home
 from .project import Project
+from .stream import StreamDecoder, TrackBuilder
 from .tools import attrdict, generate_tid
+from .writer import BackgroundWriter
 
 __all__ = ["Workflowy"]
 
 
 class Workflowy:
     client_version = DEFAULT_WORKFLOWY_CLIENT_VERSION
+    project_class = Project
 
-    def __init__(self, share_id=None, sessionid=None, username=None, password=None, browser: Browser = None):
+    def __init__(self, share_id=None, sessionid=None, username=None, password=None, browser: Browser = None,
+                 project_class: Type[Project] = None, lazy=False, stream=False, concurrent=False):
+        self._init_state(share_id=share_id, browser=browser, project_class=project_class, lazy=lazy, stream=stream,
+                         concurrent=concurrent)
+
+        if sessionid is not None or username is not None:
+            username_or_sessionid = sessionid or username
+            self.login(username_or_sessionid, password)
+
+        self.init()
+
+    def _init_state(self, share_id, browser, project_class, lazy, stream, concurrent=False):
         self.share_id = share_id
+        self.lazy = lazy
+        self.stream = stream
+        self.concurrent = concurrent
         self.browser = DefaultBrowser() if browser is None else browser
+        if project_class is not None:
+            self.project_class = project_class
+
         self.globals = attrdict()
         self.settings = attrdict()
         self.user_id = None
         self.main = None  # type: Project
         self.sub = []  # type: List[Project]
-
-        if sessionid is not None or username is not None:
-            username_or_sessionid = sessionid or username
-            self.login(username_or_sessionid, password)
-
-        self.init()
+        self.pipelining = 0
+        self.outbox = []  # type: List[Tuple[Project, dict, Future]]
+        self.lock = threading.RLock()  # outbox and applying results
+        self.send_lock = threading.Lock()  # keep the order of push_and_poll requests
+        self.writer = None  # type: BackgroundWriter
 
     @property
     def root(self) -> Node:
@@ -58,14 +79,17 @@ class Workflowy:
             if use_ajax_login:
                 res, data = self.browser["ajax_login"](username=username,
                                                        password=password)
-                errors = data.get("errors")
-                if errors:
-                    # 'errors' or 'success'
-                    self.handle_login_failed()
+                self._check_login(data)
             else:
                 res, data = self.browser["accounts/login/"](
                     username=username, password=password, next="", _raw=True)
 
+    def _check_login(self, data):
+        errors = data.get("errors")
+        if errors:
+            # 'errors' or 'success'
+            self.handle_login_failed()
+
     def handle_login_failed(self):
         "handle login failed"
         raise WFLoginError()
@@ -76,9 +100,11 @@ class Workflowy:
 
     def init(self):
         "Autometic called by __init__(), don't call directly until required."
-        data = self._get_initialization_data()
+        data, index = self._get_initialization_data()
         _, home_content = self.browser[""](_raw=True)
+        self._load_initialization_data(data, index, home_content)
 
+    def _load_initialization_data(self, data, index, home_content):
         self.globals.update(get_globals_from_home(home_content))
         self.globals.update(data["globals"])
         self.settings.update(data["settings"])
@@ -86,21 +112,22 @@ class Workflowy:
         self.user_id = int(self.globals['USER_ID'])
 
         ptree = data["projectTreeData"]
-        self._build_projects_from_ptree(ptree)
+        self._build_projects_from_ptree(ptree, index=index)
 
         self.client_id = ptree["clientId"]
 
-    def _build_projects_from_ptree(self, ptree):
+    def _build_projects_from_ptree(self, ptree, index=None):
         if self.main is None:
-            self.main = Project(self, ptree["mainProjectTreeInfo"])
+            self.main = self.project_class(self, ptree["mainProjectTreeInfo"], lazy=self.lazy, index=index,
+                                           concurrent=self.concurrent)
         else:
-            self.main._refresh_project(ptree["mainProjectTreeInfo"])
+            self.main._refresh_project(ptree["mainProjectTreeInfo"], index=index)
 
         # TODO: _refresh_project on sub project
         for sub_ptree in ptree["auxiliaryProjectTreeInfos"]:
-            self.sub.append(Project(self, sub_ptree))
+            self.sub.append(self.project_class(self, sub_ptree, lazy=self.lazy, concurrent=self.concurrent))
 
-    def _get_initialization_data(self):
+    def _get_initialization_info(self):
         info = dict(
             client_version=self.client_version,
         )
@@ -108,10 +135,18 @@ class Workflowy:
         if self.share_id is not None:
             info.update(share_id=self.share_id)
 
+        return info
+
+    def _get_initialization_data(self):
+        info = self._get_initialization_info()
+
         def get_initialization_data():
             try:
+                if self.stream:
+                    return self._decode_initialization_stream(info)
+
                 _, data = self.browser["get_initialization_data"](_query=info)
-                return data
+                return data, None
             except Exception as e:
                 raise WFLoginError from e
 
@@ -121,7 +156,21 @@ class Workflowy:
             self.handle_logout()
             return get_initialization_data()
 
+    def _decode_initialization_stream(self, info):
+        _, chunks = self.browser.open_stream("get_initialization_data", _query=info)
+        return self._decode_initialization_chunks(chunks)
+
+    def _decode_initialization_chunks(self, chunks):
+        builder = TrackBuilder()
+        data = StreamDecoder(chunks, on_node=builder).decode()
+        ptree = data["projectTreeData"]["mainProjectTreeInfo"]
+        return data, builder.finish(ptree["rootProjectChildren"])
+
     def _push_and_poll(self, transaction):
+        _, data = self.browser["push_and_poll"](**self._get_push_and_poll_info(transaction))
+        return data
+
+    def _get_push_and_poll_info(self, transaction):
         info = dict(
             client_id=self.client_id,
             client_version=self.client_version,
@@ -135,9 +184,134 @@ class Workflowy:
             assert mpstatus.share_type == "url"
             info.update(share_id=mpstatus.share_id)
 
-        _, data = self.browser["push_and_poll"](**info)
+        return info
 
-        return data
+    def push_transaction(self, project: Project, transaction) -> Future:
+        """
+        queue the transaction of project, and send it
+        unless pipelining or background writer is started.
+
+        :return: future of the push_and_poll result of the transaction.
+        """
+        future = Future()
+        with self.lock:
+            self.outbox.append((project, transaction, future))
+            if self.writer is not None:
+                self.writer.notify(len(transaction['operations']))
+                return future
+
+        if not self.pipelining:
+            self.flush()
+
+        return future
+
+    def is_deferred(self) -> bool:
+        """
+        check the transactions are only queued by push_transaction. (pipelining or background writer)
+        """
+        return bool(self.pipelining) or self.writer is not None
+
+    def flush(self) -> list:
+        """
+        send all queued transactions in one push_and_poll request,
+        and apply each result to its project.
+
+        :return: results of push_and_poll, aligned with the queued transactions.
+        """
+        if self.writer is not None:
+            return self.writer.flush()
+
+        futures = self._send_outbox()
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                raise error
+
+        return [future.result() for future in futures]
+
+    def _send_outbox(self) -> List[Future]:
+        with self.send_lock:
+            with self.lock:
+                queued, self.outbox = self.outbox, []
+
+            if not queued:
+                return []
+
+            try:
+                response = self._push_and_poll([transaction for _, transaction, _ in queued])
+            except Exception as e:
+                self._fail_queued(queued, e)
+                raise
+
+            return self._apply_results(queued, response)
+
+    def _fail_queued(self, queued, error):
+        with self.lock:
+            # later transactions may depend on the earlier ones.
+            for project, transaction, future in reversed(queued):
+                project.rollback_transaction(transaction)
+                future.set_exception(error)
+
+    def _apply_results(self, queued, response) -> List[Future]:
+        failed = []
+        with self.lock:
+            for (project, transaction, future), result in zip(queued, response['results']):
+                if result.get('error'):
+                    failed.append((project, transaction, future, result))
+                    continue
+
+                # apply the other results, they are already done by server.
+                project.apply_result(result, transaction)
+                future.set_result(result)
+
+            # later transactions may depend on the earlier ones.
+            for project, transaction, future, result in reversed(failed):
+                try:
+                    project.apply_result(result, transaction)
+                except WFRuntimeError as e:
+                    future.set_exception(e)
+
+        return [future for _, _, future in queued]
+
+    def start_writer(self, max_operations=100, max_delay=None) -> BackgroundWriter:
+        """
+        start write-behind mode: commits are queued,
+        and sent by background thread. (see wfapi.writer.BackgroundWriter)
+
+        the projects are switched to concurrent and optimistic mode,
+        as the results are applied by the background thread after the next commits.
+        """
+        if self.writer is None:
+            self.concurrent = True
+            for project in [self.main] + self.sub:
+                project.enable_concurrent()
+                project.optimistic = True
+
+            self.writer = BackgroundWriter(self, max_operations=max_operations, max_delay=max_delay)
+
+        return self.writer
+
+    def close(self):
+        """
+        send the queued transactions and stop the background writer.
+        """
+        if self.writer is not None:
+            self.writer.close()
+
+    @contextmanager
+    def pipeline(self):
+        """
+        queue the commits of main and sub projects,
+        and send them in one push_and_poll request at the end.
+        """
+        self.pipelining += 1
+        try:
+            yield self
+        finally:
+            self.pipelining -= 1
+
+        if not self.pipelining:
+            self.flush()
 
     @contextmanager
     def transaction(self):
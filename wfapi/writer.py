@@ -0,0 +1,136 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+if False:
+    from .workflowy import Workflowy
+
+__all__ = ["BackgroundWriter"]
+
+
+class BackgroundWriter:
+    """
+    write-behind mode of Workflowy.
+
+    committed transactions are queued, and sent by the background thread
+    when max_operations operations are queued or max_delay seconds are passed
+    from the first queued transaction. (default is the polling interval of main project)
+
+    the projects are in concurrent and optimistic mode: operations are applied
+    when queued, and confirmed (or rolled back) by the background thread.
+    each commit returns futures of its transactions, and errors of the
+    background sending are raised again by flush() and close().
+
+    >>> writer = wf.start_writer(max_operations=500)
+    >>> node.edit("queued")
+    >>> wf.flush()  # send now, and wait
+    >>> wf.close()
+    """
+
+    def __init__(self, workflowy: "Workflowy", max_operations=100, max_delay=None):
+        if max_delay is None:
+            max_delay = workflowy.main.status.polling_interval
+
+        self.workflowy = workflowy
+        self.max_operations = max_operations
+        self.max_delay = max_delay
+        self.condition = threading.Condition(workflowy.lock)
+        self.queued_operations = 0
+        self.first_queued_at = None
+        self.errors = []  # type: List[BaseException]
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, name="wfapi-writer", daemon=True)
+        self.thread.start()
+
+    def notify(self, operation_count):
+        # called with workflowy.lock by Workflowy.push_transaction
+        if self.closed:
+            raise RuntimeError("writer is closed")
+
+        if self.first_queued_at is None:
+            self.first_queued_at = time.monotonic()
+
+        self.queued_operations += operation_count
+        self.condition.notify()
+
+    def _get_timeout(self):
+        # seconds until the queued transactions should be sent, None for no transaction.
+        if not self.workflowy.outbox:
+            return None
+
+        if self.closed or self.queued_operations >= self.max_operations:
+            return 0
+
+        return max(0, self.first_queued_at + self.max_delay - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self.condition:
+                timeout = self._get_timeout()
+                while timeout != 0:
+                    if self.closed and timeout is None:
+                        return
+
+                    self.condition.wait(timeout)
+                    timeout = self._get_timeout()
+
+            self._send()
+
+    def _send(self) -> List[Future]:
+        with self.condition:
+            self.queued_operations = 0
+            self.first_queued_at = None
+
+        try:
+            futures = self.workflowy._send_outbox()
+        except Exception as e:
+            with self.condition:
+                self.errors.append(e)
+
+            return []
+
+        with self.condition:
+            self.errors.extend(
+                future.exception() for future in futures
+                if future.exception() is not None
+            )
+
+        return futures
+
+    def flush(self) -> list:
+        """
+        send the queued transactions now, and wait.
+        raise the first error from the transactions sent after the last flush.
+
+        :return: results of push_and_poll sent by this flush.
+        """
+        futures = self._send()
+        with self.condition:
+            errors, self.errors = self.errors, []
+
+        if errors:
+            raise errors[0]
+
+        return [future.result() for future in futures]
+
+    def close(self):
+        """
+        send the queued transactions, and stop the background thread.
+        """
+        with self.condition:
+            self.closed = True
+            if self.workflowy.writer is self:
+                self.workflowy.writer = None
+
+            self.condition.notify()
+
+        self.thread.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()